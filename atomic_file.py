@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨运行保存的状态文件（条件请求缓存、熔断状态、延迟直方图、天气缓存、指标）的写入
+先写同目录下的临时文件再替换，写到一半退出时旧文件保持完整，下次运行照常读取
+"""
+
+import json
+import os
+
+
+def write_text(path, text):
+    """整体替换文本文件；目录不存在时先创建"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def save_json(path, data, **kwargs):
+    """把 data 写成 JSON 文件，kwargs 传给 json.dumps（ensure_ascii、indent 等）；
+    data 可能被其他线程修改时，调用方在锁内调用"""
+    write_text(path, json.dumps(data, **kwargs))
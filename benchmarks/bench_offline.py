@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线端到端基准
+本地起一个 HTTP 服务，按 NewsFetcher / MessagePusher 用到的每个接口返回 fixtures/ 中的样例数据，
+HttpClient 把所有请求改写到本地服务，不访问外网即可测出每个 fetch_*、format_message、push 的耗时。
+
+每个接口可以单独设置场景：
+    good       正常返回（支持 ETag / 304）
+    slow       延迟 --slow-seconds 秒后正常返回
+    error      返回 503
+    oversized  返回超过 HttpClient 大小上限的响应
+
+用法：
+    python benchmarks/bench_offline.py
+    python benchmarks/bench_offline.py --mode concurrent --scenario zhihu=slow,36kr=oversized --repeat 10
+    python benchmarks/bench_offline.py --scenario error --json bench.json
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from feed_cache import FeedCache  # noqa: E402
+from http_client import DEFAULT_MAX_BYTES, HttpClient  # noqa: E402
+from news_fetcher import DEFAULT_LIMITS, MessagePusher, NewsFetcher  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# 接口名, 主机, 路径前缀, 样例文件
+ROUTES = (
+    ('zhihu', 'www.zhihu.com', '/api/v3/feed/topstory/hot-lists/total', 'zhihu_hot.json'),
+    ('baidu', 'top.baidu.com', '/api/board', 'baidu_hot.json'),
+    ('toutiao', 'www.toutiao.com', '/hot-event/hot-board/', 'toutiao_hot.json'),
+    ('toutiao_rss', 'rsshub.app', '/toutiao/keyword/', 'toutiao_rss.xml'),
+    ('douyin', 'www.iesdouyin.com', '/web/api/v2/hotsearch/billboard/word/', 'douyin_hot.json'),
+    ('douyin_rss', 'rsshub.app', '/douyin/hot', 'douyin_rss.xml'),
+    ('36kr', 'www.36kr.com', '/feed', '36kr.xml'),
+    ('sspai', 'sspai.com', '/feed', 'sspai.xml'),
+    ('ifanr', 'www.ifanr.com', '/feed', 'ifanr.xml'),
+    ('jiqizhixin', 'rsshub.app', '/jiqizhixin/ai', 'jiqizhixin.xml'),
+    ('36kr_ai', 'rsshub.app', '/36kr/search/AI', '36kr_ai.xml'),
+    ('wttr', 'wttr.in', '/', 'wttr.json'),
+    ('yiketianqi', 'v1.yiketianqi.com', '/api', 'yiketianqi.json'),
+    ('serverchan', 'sctapi.ftqq.com', '/', 'serverchan.json'),
+    ('pushplus', 'www.pushplus.plus', '/send', 'pushplus.json'),
+    ('webhook', 'hooks.example.com', '/', 'webhook.json'),
+)
+SCENARIOS = ('good', 'slow', 'error', 'oversized')
+
+# 计时的方法（包括备用方案）
+TIMED_METHODS = (
+    'fetch_weather', '_fetch_weather_backup',
+    'fetch_hot_news', 'fetch_toutiao_hot', 'fetch_douyin_hot',
+    'fetch_tech_news', 'fetch_ai_news', '_fetch_backup',
+)
+
+
+def load_fixtures():
+    payloads = {}
+    for name, _, _, filename in ROUTES:
+        with open(os.path.join(FIXTURES, filename), 'rb') as f:
+            payloads[name] = f.read()
+    return payloads
+
+
+def match_route(path):
+    """/主机/路径 → 接口名"""
+    host, _, rest = path.lstrip('/').partition('/')
+    rest = '/' + unquote(rest.split('?', 1)[0])
+    for name, route_host, prefix, _ in ROUTES:
+        if host == route_host and rest.startswith(prefix):
+            return name
+    return None
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """按场景返回样例数据"""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # 避免 keep-alive 下头和正文分两次写触发 40ms 延迟确认
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._serve()
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        self._serve()
+
+    def _reply(self, status, body=b'', headers=None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端发现超过大小上限后会提前断开
+            pass
+
+    def _serve(self):
+        server = self.server
+        name = match_route(self.path)
+        server.record(name)
+        if name is None:
+            return self._reply(404, b'not found')
+
+        scenario = server.scenarios.get(name, server.default_scenario)
+        if scenario == 'slow':
+            time.sleep(server.slow_seconds)
+        if scenario == 'error':
+            return self._reply(503, b'service unavailable')
+
+        body = server.payloads[name]
+        if scenario == 'oversized':
+            body = body + b' ' * (server.oversized_bytes - len(body))
+        content_type = 'application/rss+xml; charset=utf-8' if body.lstrip().startswith(b'<') \
+            else 'application/json; charset=utf-8'
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            return self._reply(304, headers={'ETag': etag})
+        self._reply(200, body, {'Content-Type': content_type, 'ETag': etag})
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, scenarios, default_scenario='good', slow_seconds=3.0, oversized_bytes=None):
+        super().__init__(('127.0.0.1', 0), StandInHandler)
+        self.payloads = load_fixtures()
+        self.scenarios = scenarios
+        self.default_scenario = default_scenario
+        self.slow_seconds = slow_seconds
+        self.oversized_bytes = oversized_bytes or DEFAULT_MAX_BYTES + 1024 * 1024
+        self.hits = {}
+        self.hits_lock = threading.Lock()
+
+    def record(self, name):
+        with self.hits_lock:
+            self.hits[name] = self.hits.get(name, 0) + 1
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def rewrite(self, url):
+        """https://主机/路径 → http://127.0.0.1:端口/主机/路径"""
+        parts = urlsplit(url)
+        query = f"?{parts.query}" if parts.query else ''
+        return f"{self.base_url}/{parts.netloc}{parts.path}{query}"
+
+
+def instrument(timings):
+    """给 NewsFetcher 的抓取方法加上计时（并发模式下临时实例同样会计时）"""
+    lock = threading.Lock()
+    for name in TIMED_METHODS:
+        original = getattr(NewsFetcher, name)
+
+        def timed(self, *args, __original=original, __name=name, **kwargs):
+            start = time.perf_counter()
+            try:
+                return __original(self, *args, **kwargs)
+            finally:
+                with lock:
+                    timings.setdefault(__name, []).append(time.perf_counter() - start)
+
+        setattr(NewsFetcher, name, wraps(original)(timed))
+
+
+def run_once(server, mode, feed_cache_path, args, timings):
+    """完整跑一遍：抓取 → 渲染 → 推送"""
+    http = HttpClient(rewrite=server.rewrite, feed_cache=FeedCache(feed_cache_path), dns_ttl=0)
+    fetcher = NewsFetcher(http=http)
+    result = {}
+
+    start = time.perf_counter()
+    if mode == 'sequential':
+        fetcher.fetch_weather(city=args.city)
+        fetcher.fetch_hot_news(limit=DEFAULT_LIMITS['hot_news'])
+        fetcher.fetch_toutiao_hot(limit=DEFAULT_LIMITS['toutiao_hot'])
+        fetcher.fetch_douyin_hot(limit=DEFAULT_LIMITS['douyin_hot'])
+        fetcher.fetch_tech_news(limit=DEFAULT_LIMITS['tech_news'])
+        fetcher.fetch_ai_news(limit=DEFAULT_LIMITS['ai_news'])
+    else:
+        fetcher.fetch_all(city=args.city, deadline=args.deadline, hedge_delay=args.hedge_delay)
+    result['fetch'] = time.perf_counter() - start
+
+    stage = time.perf_counter()
+    message = fetcher.format_message("早间新闻")
+    result['format_message'] = time.perf_counter() - stage
+
+    stage = time.perf_counter()
+    MessagePusher(args.push_type, 'bench-key', http=http).push("早间新闻", message)
+    result['push'] = time.perf_counter() - stage
+    result['total'] = time.perf_counter() - start
+
+    http.feed_cache.save()
+    for key, value in result.items():
+        timings.setdefault(key, []).append(value)
+    result['items'] = {attr: len(getattr(fetcher, attr)) for attr in DEFAULT_LIMITS}
+    result['bytes'] = len(message.encode('utf-8'))
+    return result
+
+
+def parse_scenarios(spec):
+    """'good' 或 'zhihu=slow,36kr=oversized' 或 'error,zhihu=good'"""
+    default = 'good'
+    scenarios = {}
+    for part in filter(None, (p.strip() for p in spec.split(','))):
+        if '=' in part:
+            name, scenario = part.split('=', 1)
+            scenarios[name] = scenario
+        else:
+            default = part
+    names = {route[0] for route in ROUTES}
+    for name, scenario in scenarios.items():
+        if name not in names:
+            raise SystemExit(f"未知接口 {name}，可选: {', '.join(sorted(names))}")
+        if scenario not in SCENARIOS:
+            raise SystemExit(f"未知场景 {scenario}，可选: {', '.join(SCENARIOS)}")
+    if default not in SCENARIOS:
+        raise SystemExit(f"未知场景 {default}，可选: {', '.join(SCENARIOS)}")
+    return default, scenarios
+
+
+def summarize(timings):
+    rows = {}
+    for key, values in timings.items():
+        rows[key] = {
+            'count': len(values),
+            'median_ms': statistics.median(values) * 1000,
+            'min_ms': min(values) * 1000,
+            'max_ms': max(values) * 1000,
+        }
+    return rows
+
+
+def print_report(mode, rows, hits, sample):
+    print(f"\n=== {mode} ===")
+    print(f"{'阶段':<24}{'次数':>6}{'中位数(ms)':>14}{'最小(ms)':>12}{'最大(ms)':>12}")
+    order = [*TIMED_METHODS, 'fetch', 'format_message', 'push', 'total']
+    for key in order:
+        if key in rows:
+            row = rows[key]
+            print(f"{key:<24}{row['count']:>6}{row['median_ms']:>14.1f}{row['min_ms']:>12.1f}{row['max_ms']:>12.1f}")
+    print(f"条数: {sample['items']}  消息大小: {sample['bytes']} 字节")
+    print(f"接口请求次数: {dict(sorted(hits.items(), key=lambda kv: str(kv[0])))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线端到端基准")
+    parser.add_argument('--mode', choices=('sequential', 'concurrent', 'both'), default='both')
+    parser.add_argument('--scenario', default='good', help="默认场景，或 接口=场景 列表，逗号分隔")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--slow-seconds', type=float, default=3.0)
+    parser.add_argument('--deadline', type=float, default=30)
+    parser.add_argument('--hedge-delay', type=float, default=None)
+    parser.add_argument('--city', default='石家庄')
+    parser.add_argument('--push-type', choices=('pushplus', 'serverchan'), default='pushplus')
+    parser.add_argument('--warm', action='store_true', help="多次运行之间保留 RSS 缓存（第一次为冷启动）")
+    parser.add_argument('--json', help="把结果写入 JSON 文件")
+    parser.add_argument('--verbose', action='store_true', help="显示程序自身的输出")
+    args = parser.parse_args()
+
+    default, scenarios = parse_scenarios(args.scenario)
+    modes = ('sequential', 'concurrent') if args.mode == 'both' else (args.mode,)
+    report = {'scenario': args.scenario, 'repeat': args.repeat, 'modes': {}}
+
+    for mode in modes:
+        server = StandInServer(scenarios, default, args.slow_seconds)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        timings = {}
+        instrument(timings)
+        with tempfile.TemporaryDirectory() as tmp:
+            sample = None
+            for run in range(args.repeat):
+                cache_path = os.path.join(tmp, 'feed_cache.json' if args.warm else f'feed_cache_{run}.json')
+                output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+                with output:
+                    sample = run_once(server, mode, cache_path, args, timings)
+        server.shutdown()
+        server.server_close()
+        # 恢复原方法，下一个模式重新计时
+        for name in TIMED_METHODS:
+            setattr(NewsFetcher, name, getattr(NewsFetcher, name).__wrapped__)
+
+        rows = summarize(timings)
+        print_report(mode, rows, server.hits, sample)
+        report['modes'][mode] = {'stages': rows, 'requests': server.hits, 'items': sample['items'],
+                                 'message_bytes': sample['bytes']}
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+        print(f"\n结果已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,547 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+渲染微基准：对比 renderer.MessageRenderer 和重构前的字符串拼接实现
+“无缓存”每次都清空片段缓存、模块级缓存和字宽表，并重新转义标题和链接；
+它比字符串拼接多做了 HTML 转义和按显示宽度截断摘要，所以比字符串拼接慢，片段缓存命中时才更快
+
+用法：python benchmarks/bench_render.py [订阅者数量]
+"""
+
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import normalize  # noqa: E402
+import renderer  # noqa: E402
+from news_fetcher import SECTIONS, NewsFetcher  # noqa: E402
+from news_item import make_item  # noqa: E402
+from renderer import MessageRenderer, escape  # noqa: E402
+
+
+class LegacyFormatter:
+    """重构前的字符串拼接实现，作为对比基线
+
+    拼接逻辑沿用重构前的 NewsFetcher.format_message；为了和 MessageRenderer 在同样的输入下比较，
+    后来补上了 sections / weather / now 参数和话题标签的样式，不是逐字保留的旧代码
+    """
+
+    def format_message(self, title="每日新闻", sections=None, weather=None, now=None):
+        """格式化消息内容 - 简洁白风格（仅用于对比）"""
+        sections = SECTIONS if sections is None else sections
+        weather = weather or self.weather
+        now = now or datetime.now()
+        date_str = now.strftime("%Y年%m月%d日")
+        time_str = now.strftime("%H:%M")
+        weekday_map = {0: "周一", 1: "周二", 2: "周三", 3: "周四", 4: "周五", 5: "周六", 6: "周日"}
+        weekday = weekday_map[now.weekday()]
+
+        # 简洁白风格 HTML 模板
+        html = f"""
+<!DOCTYPE html>
+<html>
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<style>
+    * {{
+        margin: 0;
+        padding: 0;
+        box-sizing: border-box;
+    }}
+    body {{
+        background: #f5f5f7;
+        color: #1d1d1f;
+        font-family: -apple-system, BlinkMacSystemFont, "SF Pro Display", "Segoe UI", "PingFang SC", sans-serif;
+        padding: 0;
+        margin: 0;
+        line-height: 1.6;
+    }}
+    .container {{
+        max-width: 100%;
+        background: #f5f5f7;
+    }}
+    .header {{
+        background: #fff;
+        padding: 24px 16px;
+        text-align: center;
+        border-bottom: 1px solid #e5e5e7;
+    }}
+    .header h1 {{
+        color: #1d1d1f;
+        font-size: 22px;
+        font-weight: 600;
+        margin: 0;
+    }}
+    .time-bar {{
+        background: #fff;
+        padding: 12px 16px;
+        font-size: 13px;
+        color: #86868b;
+        text-align: center;
+        border-bottom: 1px solid #e5e5e7;
+    }}
+    .section {{
+        margin-top: 12px;
+    }}
+    .section-header {{
+        background: #fff;
+        color: #1d1d1f;
+        padding: 12px 16px;
+        font-size: 17px;
+        font-weight: 600;
+        border-bottom: 1px solid #e5e5e7;
+    }}
+    .news-card {{
+        background: #fff;
+        border-bottom: 1px solid #e5e5e7;
+        padding: 16px;
+    }}
+    .news-card:active {{
+        background: #f5f5f7;
+    }}
+    .rank {{
+        display: inline-block;
+        background: #f5f5f7;
+        color: #1d1d1f;
+        font-weight: 600;
+        font-size: 12px;
+        padding: 4px 10px;
+        border-radius: 12px;
+        margin-bottom: 8px;
+        min-width: 36px;
+        text-align: center;
+    }}
+    .rank.top {{
+        background: #ff3b30;
+        color: #fff;
+    }}
+    .news-title {{
+        color: #1d1d1f;
+        font-size: 15px;
+        line-height: 1.5;
+        text-decoration: none;
+        display: block;
+        margin-bottom: 8px;
+        font-weight: 400;
+    }}
+    .hot-tag {{
+        display: inline-block;
+        background: #ff3b30;
+        color: #fff;
+        font-size: 11px;
+        padding: 2px 8px;
+        border-radius: 10px;
+        font-weight: 500;
+        margin-top: 4px;
+    }}
+    .topic-tag {{
+        display: inline-block;
+        background: #f5f5f7;
+        color: #6e6e73;
+        font-size: 11px;
+        padding: 2px 8px;
+        border-radius: 10px;
+        margin: 4px 0 0 4px;
+    }}
+    .tech-card {{
+        background: #fff;
+        border-left: 3px solid #007aff;
+        padding: 16px;
+        margin-bottom: 1px;
+    }}
+    .tech-card:active {{
+        background: #f5f5f7;
+    }}
+    .tech-number {{
+        color: #007aff;
+        font-weight: 600;
+        font-size: 13px;
+        margin-bottom: 8px;
+    }}
+    .tech-title {{
+        color: #1d1d1f;
+        font-size: 15px;
+        font-weight: 500;
+        line-height: 1.5;
+        margin-bottom: 8px;
+    }}
+    .tech-title a {{
+        color: #1d1d1f;
+        text-decoration: none;
+    }}
+    .tech-summary {{
+        color: #86868b;
+        font-size: 13px;
+        line-height: 1.5;
+        margin-bottom: 8px;
+    }}
+    .read-more {{
+        color: #007aff;
+        font-size: 13px;
+        font-weight: 500;
+        text-decoration: none;
+    }}
+    .weather-card {{
+        background: linear-gradient(135deg, #007aff 0%, #5ac8fa 100%);
+        padding: 20px 16px;
+        color: #fff;
+        margin-top: 12px;
+    }}
+    .weather-title {{
+        font-size: 17px;
+        font-weight: 600;
+        margin-bottom: 16px;
+        text-align: center;
+    }}
+    .weather-grid {{
+        display: grid;
+        grid-template-columns: 1fr 1fr;
+        gap: 12px;
+    }}
+    .weather-item {{
+        background: rgba(255, 255, 255, 0.15);
+        padding: 16px;
+        border-radius: 12px;
+        text-align: center;
+        backdrop-filter: blur(10px);
+    }}
+    .weather-day {{
+        font-size: 13px;
+        opacity: 0.9;
+        margin-bottom: 8px;
+    }}
+    .weather-temp {{
+        font-size: 32px;
+        font-weight: 600;
+        margin: 8px 0;
+    }}
+    .weather-desc {{
+        font-size: 14px;
+        opacity: 0.9;
+    }}
+    .ai-card {{
+        background: #fff;
+        border-left: 3px solid #ff9500;
+        padding: 16px;
+        margin-bottom: 1px;
+    }}
+    .ai-card:active {{
+        background: #f5f5f7;
+    }}
+    .footer {{
+        background: #fff;
+        border-top: 1px solid #e5e5e7;
+        padding: 20px 16px;
+        text-align: center;
+        color: #86868b;
+        font-size: 12px;
+        margin-top: 12px;
+    }}
+    .footer-text {{
+        color: #86868b;
+        margin: 4px 0;
+    }}
+</style>
+</head>
+<body>
+<div class="container">
+    <div class="header">
+        <h1>{title}</h1>
+    </div>
+    <div class="time-bar">
+        {date_str} {weekday} {time_str}
+    </div>
+"""
+
+        # 天气预报部分
+        if weather and 'weather' in sections:
+            w = weather
+            # 获取穿衣建议
+            clothing = self.get_clothing_suggestion(w['today']['temp'])
+            html += f"""
+    <div class="weather-card">
+        <div class="weather-title">🌤️ {w['city']} 天气预报</div>
+        <div class="weather-grid">
+            <div class="weather-item">
+                <div class="weather-day">今天</div>
+                <div class="weather-temp">{w['today']['temp']}°</div>
+                <div class="weather-desc">{w['today']['weather']}</div>
+                <div class="weather-desc">湿度 {w['today']['humidity']}%</div>
+            </div>
+            <div class="weather-item">
+                <div class="weather-day">明天</div>
+                <div class="weather-temp">{w['tomorrow']['temp_min']}~{w['tomorrow']['temp_max']}°</div>
+                <div class="weather-desc">{w['tomorrow']['weather']}</div>
+            </div>
+        </div>
+        <div style="background: rgba(255, 255, 255, 0.2); padding: 12px; border-radius: 12px; margin-top: 12px; text-align: center; font-size: 14px; backdrop-filter: blur(10px);">
+            <div style="opacity: 0.9;">穿衣建议</div>
+            <div style="font-weight: 600; margin-top: 4px;">{clothing}</div>
+        </div>
+    </div>
+"""
+
+        # 热点新闻部分
+        if self.hot_news and 'hot_news' in sections:
+            html += """
+    <div class="section">
+        <div class="section-header">🔥 热点新闻</div>
+"""
+            for idx, news in enumerate(self.hot_news[:10], 1):
+                # 格式化热度
+                hot_tag = ""
+                if news['hot']:
+                    try:
+                        hot_num = int(str(news['hot']).replace('万', '0000'))
+                        if hot_num >= 10000:
+                            hot_tag = f'<span class="hot-tag">🔥 {hot_num//10000}万热度</span>'
+                        else:
+                            hot_tag = f'<span class="hot-tag">🔥 {news["hot"]}</span>'
+                    except:
+                        hot_tag = f'<span class="hot-tag">🔥 {news["hot"]}</span>'
+
+                # 前三名特殊标记
+                rank_class = "top" if idx <= 3 else ""
+
+                html += f"""
+        <div class="news-card">
+            <span class="rank {rank_class}">#{idx}</span>
+            <a href="{news['url']}" class="news-title">{news['title']}</a>
+            {hot_tag}
+        </div>
+"""
+            html += """
+    </div>
+"""
+
+        # 今日头条热榜部分
+        if self.toutiao_hot and 'toutiao_hot' in sections:
+            html += """
+    <div class="section">
+        <div class="section-header" style="background: linear-gradient(90deg, #ff6b35, #f7931e);">📱 今日头条</div>
+"""
+            for idx, news in enumerate(self.toutiao_hot[:10], 1):
+                # 格式化热度
+                hot_tag = ""
+                if news['hot']:
+                    try:
+                        hot_num = int(str(news['hot']).replace('万', '0000'))
+                        if hot_num >= 10000:
+                            hot_tag = f'<span class="hot-tag">🔥 {hot_num//10000}万</span>'
+                        else:
+                            hot_tag = f'<span class="hot-tag">🔥 {news["hot"]}</span>'
+                    except:
+                        if news['hot']:
+                            hot_tag = f'<span class="hot-tag">🔥 {news["hot"]}</span>'
+
+                # 前三名特殊标记
+                rank_class = "top" if idx <= 3 else ""
+
+                html += f"""
+        <div class="news-card">
+            <span class="rank {rank_class}">#{idx}</span>
+            <a href="{news['url']}" class="news-title">{news['title']}</a>
+            {hot_tag}
+        </div>
+"""
+            html += """
+    </div>
+"""
+
+        # 抖音热榜部分
+        if self.douyin_hot and 'douyin_hot' in sections:
+            html += """
+    <div class="section">
+        <div class="section-header" style="background: linear-gradient(90deg, #000, #333);">🎵 抖音热榜</div>
+"""
+            for idx, news in enumerate(self.douyin_hot[:10], 1):
+                # 格式化热度
+                hot_tag = ""
+                if news['hot']:
+                    try:
+                        hot_num = int(str(news['hot']))
+                        if hot_num >= 10000:
+                            hot_tag = f'<span class="hot-tag">🔥 {hot_num//10000}万</span>'
+                        else:
+                            hot_tag = f'<span class="hot-tag">🔥 {hot_num}</span>'
+                    except:
+                        if news['hot']:
+                            hot_tag = f'<span class="hot-tag">🔥 {news["hot"]}</span>'
+
+                # 前三名特殊标记
+                rank_class = "top" if idx <= 3 else ""
+
+                html += f"""
+        <div class="news-card">
+            <span class="rank {rank_class}">#{idx}</span>
+            <a href="{news['url']}" class="news-title">{news['title']}</a>
+            {hot_tag}
+        </div>
+"""
+            html += """
+    </div>
+"""
+
+        # 科技新闻部分
+        if self.tech_news and 'tech_news' in sections:
+            html += """
+    <div class="section">
+        <div class="section-header">💻 科技资讯</div>
+"""
+            for idx, news in enumerate(self.tech_news[:10], 1):
+                # 清理摘要（缩短长度以减少总内容）
+                summary = ""
+                if news.get('summary'):
+                    summary = news['summary'].strip()
+                    summary = re.sub(r'<[^>]+>', '', summary)
+                    if len(summary) > 50:
+                        summary = summary[:50] + "..."
+
+                html += f"""
+        <div class="tech-card">
+            <div class="tech-number">[{idx:02d}]</div>
+            <div class="tech-title">
+                <a href="{news['url']}">{news['title']}</a>
+            </div>
+"""
+                # 只在前5条显示摘要
+                if summary and idx <= 5:
+                    html += f"""
+            <div class="tech-summary">{summary}</div>
+"""
+                html += f"""
+            <a href="{news['url']}" class="read-more">阅读全文 →</a>
+        </div>
+"""
+            html += """
+    </div>
+"""
+
+        # AI新闻部分
+        if self.ai_news and 'ai_news' in sections:
+            html += """
+    <div class="section">
+        <div class="section-header">🤖 AI 前沿</div>
+"""
+            for idx, news in enumerate(self.ai_news[:8], 1):
+                # 清理摘要（缩短长度）
+                summary = ""
+                if news.get('summary'):
+                    summary = news['summary'].strip()
+                    summary = re.sub(r'<[^>]+>', '', summary)
+                    if len(summary) > 50:
+                        summary = summary[:50] + "..."
+
+                html += f"""
+        <div class="ai-card">
+            <div class="tech-number">[{idx:02d}]</div>
+            <div class="tech-title">
+                <a href="{news['url']}">{news['title']}</a>
+            </div>
+"""
+                # 只在前3条显示摘要
+                if summary and idx <= 3:
+                    html += f"""
+            <div class="tech-summary">{summary}</div>
+"""
+                html += f"""
+            <a href="{news['url']}" class="read-more">阅读全文 →</a>
+        </div>
+"""
+            html += """
+    </div>
+"""
+
+        # 底部
+        html += """
+    <div class="footer">
+        <div class="footer-text">每日 08:00 / 20:00 自动推送</div>
+    </div>
+</div>
+</body>
+</html>
+"""
+        return html
+
+
+def sample_fetcher():
+    """构造一份典型的新闻数据（不访问网络），条目和真实抓取一样由 make_item 生成"""
+    fetcher = NewsFetcher()
+    fetcher.weather = {
+        'city': '石家庄',
+        'today': {'temp': '18', 'weather': '晴', 'humidity': '40'},
+        'tomorrow': {'temp_max': '22', 'temp_min': '10', 'weather': '多云'},
+    }
+    fetcher.hot_news = [make_item('zhihu', 'hot_news', i + 1, f'知乎热榜问题 {i}', f'https://www.zhihu.com/question/{i}',
+                                  hot=f'{1000 - i * 37}万热度') for i in range(6)]
+    fetcher.toutiao_hot = [make_item('toutiao', 'toutiao_hot', i + 1, f'头条热点事件 {i}',
+                                     f'https://www.toutiao.com/trending/{i}', hot=str(9000000 - i * 100000))
+                           for i in range(6)]
+    fetcher.douyin_hot = [make_item('douyin', 'douyin_hot', i + 1, f'抖音热搜词 {i}', f'https://www.douyin.com/search/{i}',
+                                    hot=12000000 - i * 300000) for i in range(6)]
+    fetcher.tech_news = [make_item('sspai', 'tech_news', i + 1, f'科技资讯标题 {i}', f'https://sspai.com/post/{i}',
+                                   summary='<p>这是一段比较长的摘要内容，' * 4 + '</p>...') for i in range(5)]
+    fetcher.ai_news = [make_item('jiqizhixin', 'ai_news', i + 1, f'AI 大模型新进展 {i}',
+                                 f'https://www.jiqizhixin.com/articles/{i}',
+                                 summary='<p>机器之心报道：模型能力继续提升。</p>...') for i in range(3)]
+    return fetcher
+
+
+def legacy_fetcher(fetcher):
+    """重构前的实现读取 dict 条目和原始热度文字"""
+    legacy = NewsFetcher()
+    legacy.weather = fetcher.weather
+    for name in ('hot_news', 'toutiao_hot', 'douyin_hot', 'tech_news', 'ai_news'):
+        setattr(legacy, name, [{'title': n.title, 'url': n.url, 'hot': n.heat_text, 'summary': n.summary}
+                               for n in getattr(fetcher, name)])
+    return legacy
+
+
+def cold_render(fetcher, now):
+    """真正的冷渲染：清空模块级缓存（热度标签、摘要、话题标签）和字宽表，
+    重新转义条目的标题和链接（正常运行时在抓取时做一次），再用新的 MessageRenderer 渲染"""
+    for cached in (renderer._hot_label, renderer.hot_tag, renderer.topic_tags, renderer.clean_summary,
+                   renderer.summary_block):
+        cached.cache_clear()
+    normalize._char_widths.clear()
+    for name in SECTIONS[1:]:
+        for news in getattr(fetcher, name):
+            news.html_title = escape(news.title)
+            news.html_url = escape(news.url)
+    return MessageRenderer().render(fetcher, "早间新闻", SECTIONS, fetcher.weather, now=now)
+
+
+def bench(label, func, editions):
+    start = time.perf_counter()
+    for _ in range(editions):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {editions} 次共 {elapsed * 1000:8.2f}ms，平均 {elapsed / editions * 1e6:8.1f}µs/次")
+    return elapsed
+
+
+def main():
+    editions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    fetcher = sample_fetcher()
+    now = datetime(2025, 1, 22, 8, 0)
+    message_renderer = MessageRenderer()
+
+    legacy_data = legacy_fetcher(fetcher)
+    legacy = LegacyFormatter.format_message(legacy_data, "早间新闻", now=now)
+    current = message_renderer.render(fetcher, "早间新闻", SECTIONS, fetcher.weather, now=now)
+    print(f"输出一致: {legacy == current}（{len(current.encode('utf-8'))} 字节）")
+
+    old = bench("字符串拼接（重构前）", lambda: LegacyFormatter.format_message(legacy_data, "早间新闻", now=now), editions)
+    new = bench("MessageRenderer（片段缓存）", lambda: message_renderer.render(
+        fetcher, "早间新闻", SECTIONS, fetcher.weather, now=now), editions)
+    cold = bench("MessageRenderer（无缓存）", lambda: cold_render(fetcher, now), editions)
+    print(f"加速比: 缓存 {old / new:.1f}x，无缓存 {old / cold:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
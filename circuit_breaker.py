@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按接口熔断
+连续失败的接口在冷却期内直接跳过（让调用方立即走备用方案），冷却结束后放行一次探测请求
+状态保存在本地文件，跨越早晚两次运行
+"""
+
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+from atomic_file import save_json
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """接口处于熔断状态，本次不发请求"""
+
+
+def endpoint_key(url):
+    """接口标识：主机 + 路径（忽略查询参数）"""
+    parts = urlsplit(url)
+    return f"{parts.netloc}{parts.path}"
+
+
+class CircuitBreaker:
+    """closed（正常）→ 连续失败 threshold 次 → open（跳过）→ 冷却 cooldown 秒 → half_open（探测一次）"""
+
+    def __init__(self, path, threshold=2, cooldown=86400):
+        self.path = path
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.endpoints = json.load(f)
+                # 上次运行中断在探测阶段的接口，重新按打开状态处理
+                for state in self.endpoints.values():
+                    if state['state'] == HALF_OPEN:
+                        state['state'] = OPEN
+            except Exception as e:
+                print(f"读取熔断状态失败，全部重置: {str(e)}")
+
+    def _state(self, key):
+        return self.endpoints.setdefault(key, {'state': CLOSED, 'failures': 0, 'opened_at': 0})
+
+    def allow(self, url):
+        """是否允许请求；打开状态且已过冷却期时放行一次探测"""
+        key = endpoint_key(url)
+        with self.lock:
+            state = self._state(key)
+            if state['state'] == CLOSED:
+                return True
+            if state['state'] == OPEN and time.time() - state['opened_at'] >= self.cooldown:
+                state['state'] = HALF_OPEN
+                print(f"熔断冷却结束，探测接口 {key}")
+                return True
+            # 打开状态，或半开状态下已有探测请求在进行
+            return False
+
+    def check(self, url):
+        """不允许请求时抛出 CircuitOpenError"""
+        if not self.allow(url):
+            raise CircuitOpenError(f"{endpoint_key(url)} 处于熔断状态，跳过")
+
+    def record_success(self, url):
+        key = endpoint_key(url)
+        with self.lock:
+            state = self._state(key)
+            if state['state'] != CLOSED:
+                print(f"接口已恢复，关闭熔断 {key}")
+            state.update(state=CLOSED, failures=0, opened_at=0)
+
+    def record_failure(self, url):
+        key = endpoint_key(url)
+        with self.lock:
+            state = self._state(key)
+            state['failures'] += 1
+            if state['state'] == HALF_OPEN or state['failures'] >= self.threshold:
+                if state['state'] != OPEN:
+                    print(f"接口连续失败 {state['failures']} 次，打开熔断 {key}")
+                state.update(state=OPEN, opened_at=time.time())
+
+    def save(self):
+        with self.lock:
+            save_json(self.path, self.endpoints, ensure_ascii=False, indent=2)
+
+    def report(self):
+        opened = [key for key, state in self.endpoints.items() if state['state'] != CLOSED]
+        if not opened:
+            return "熔断: 所有接口正常"
+        return f"熔断: {len(opened)} 个接口处于熔断状态 - " + ", ".join(opened)
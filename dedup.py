@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨来源去重
+同一事件经常同时出现在知乎/百度、头条、抖音，或同时出现在科技和AI板块。
+标题切成字符二元组后做 MinHash + LSH 分桶，只比较同桶的候选对，
+近似线性时间内把相近的标题聚成一组，每组只保留一张卡片并记录所有来源
+"""
+
+import random
+import re
+import zlib
+from urllib.parse import urlsplit
+
+from news_item import SOURCE_LABELS
+
+
+# 需要互相去重的板块，排在前面的板块保留卡片
+DEDUP_GROUPS = (
+    ('hot_news', 'toutiao_hot', 'douyin_hot'),
+    ('ai_news', 'tech_news'),  # AI 板块更具体，重复时保留在 AI 板块
+)
+
+# 来源名称：优先用条目带的来源名称（新闻源注册表的 label），其次按来源 id、链接域名识别，
+# 都识别不出时用板块名
+SOURCE_HOSTS = {
+    'zhihu.com': '知乎',
+    'baidu.com': '百度',
+    'toutiao.com': '头条',
+    'douyin.com': '抖音',
+    '36kr.com': '36氪',
+    'sspai.com': '少数派',
+    'ifanr.com': '爱范儿',
+    'jiqizhixin.com': '机器之心',
+}
+SECTION_NAMES = {
+    'hot_news': '热点',
+    'toutiao_hot': '头条',
+    'douyin_hot': '抖音',
+    'tech_news': '科技',
+    'ai_news': 'AI',
+}
+
+# 中文热榜标题里常见的提问套话，不参与相似度计算
+FILLER_PATTERN = re.compile(r'如何看待|如何评价|怎么看待|怎么看|怎样看待|为什么|是什么|有哪些|官方回应|最新消息')
+# 只保留汉字、字母和数字
+NOISE_PATTERN = re.compile(r'[^0-9a-z\u4e00-\u9fff]+')
+NUMBER_PATTERN = re.compile(r'\d+')
+
+# 标题很短，二元组 Jaccard 取 0.5 时“小米发布新手机”和“华为发布新手机”就算重复；0.7 要求绝大部分二元组相同
+SIMILARITY = 0.7
+
+MERSENNE_PRIME = (1 << 61) - 1
+
+
+def source_name(section, item):
+    if item.label:
+        return item.label
+    if item.source in SOURCE_LABELS:
+        return SOURCE_LABELS[item.source]
+    host = urlsplit(item.url).netloc.lower()
+    for suffix, name in SOURCE_HOSTS.items():
+        if host == suffix or host.endswith('.' + suffix):
+            return name
+    return SECTION_NAMES.get(section, section)
+
+
+def shingles(title):
+    """标题 → 字符二元组集合"""
+    text = NOISE_PATTERN.sub('', FILLER_PATTERN.sub('', title.lower()))
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def numbers(title):
+    """标题里的数字（型号、届数、年份等）"""
+    return frozenset(NUMBER_PATTERN.findall(title))
+
+
+def numbers_conflict(a, b):
+    """两个标题都带数字、且谁也不包含谁时是不同的事件（iPhone 16 和 iPhone 17）；
+    只有一边多出数字时（“报名人数公布：388万”）只是多了细节"""
+    return bool(a and b) and not (a <= b or b <= a)
+
+
+def is_similar(a, b, threshold=SIMILARITY, containment=0.8):
+    """Jaccard 相似度达到阈值，或短标题基本被长标题包含"""
+    if not a or not b:
+        return False
+    common = len(a & b)
+    if common / len(a | b) >= threshold:
+        return True
+    return min(len(a), len(b)) >= 3 and common / min(len(a), len(b)) >= containment
+
+
+class MinHashLSH:
+    """MinHash 签名 + 分段 LSH；bands × rows = num_perm，rows 越小召回越高"""
+
+    def __init__(self, num_perm=64, bands=32, seed=20250122):
+        rng = random.Random(seed)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.params = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME))
+                       for _ in range(num_perm)]
+
+    def signature(self, shingle_set):
+        hashes = [zlib.crc32(s.encode('utf-8')) for s in shingle_set]
+        return [min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in self.params]
+
+    def candidates(self, signatures):
+        """同一段签名落入同一桶的下标对"""
+        pairs = set()
+        for band in range(self.bands):
+            buckets = {}
+            start = band * self.rows
+            for idx, sig in enumerate(signatures):
+                if sig is None:
+                    continue
+                buckets.setdefault(tuple(sig[start:start + self.rows]), []).append(idx)
+            for members in buckets.values():
+                for i in range(len(members)):
+                    for j in range(i + 1, len(members)):
+                        pairs.add((members[i], members[j]))
+        return pairs
+
+
+def cluster_titles(titles, threshold=SIMILARITY, lsh=None):
+    """把相近的标题聚类，返回下标分组（组内按原顺序）"""
+    lsh = lsh or MinHashLSH()
+    sets = [shingles(title) for title in titles]
+    nums = [numbers(title) for title in titles]
+    signatures = [lsh.signature(s) if s else None for s in sets]
+
+    parent = list(range(len(titles)))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for i, j in lsh.candidates(signatures):
+        if is_similar(sets[i], sets[j], threshold) and not numbers_conflict(nums[i], nums[j]):
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    clusters = {}
+    for idx in range(len(titles)):
+        clusters.setdefault(find(idx), []).append(idx)
+    return list(clusters.values())
+
+
+def merge_duplicate_stories(fetcher, groups=DEDUP_GROUPS, threshold=SIMILARITY):
+    """对抓取结果去重：每个故事保留最靠前的一张卡片，sources 记录所有报道来源"""
+    removed = 0
+    lsh = MinHashLSH()
+    for sections in groups:
+        entries = [(section, item) for section in sections for item in getattr(fetcher, section)]
+        if len(entries) < 2:
+            continue
+
+        keep = {}
+        drop = set()
+        for cluster in cluster_titles([item.title for _, item in entries], threshold, lsh):
+            first = cluster[0]
+            sources = []
+            for idx in cluster:
+                name = source_name(*entries[idx])
+                if name not in sources:
+                    sources.append(name)
+            keep[first] = sources
+            drop.update(cluster[1:])
+
+        for section in sections:
+            setattr(fetcher, section, [])
+        for idx, (section, item) in enumerate(entries):
+            if idx in drop:
+                continue
+            # 复制一份再写 sources，AI 话题筛选出的条目可能和科技板块是同一条新闻
+            getattr(fetcher, section).append(item.replace(sources=tuple(keep[idx])))
+        removed += len(drop)
+
+    if removed:
+        print(f"跨来源去重：合并了 {removed} 条重复新闻")
+    return removed
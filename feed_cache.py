@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RSS 条件请求缓存
+按 URL 保存 ETag / Last-Modified 和解析后的条目，源站返回 304 时直接复用
+"""
+
+import json
+import os
+import threading
+
+from atomic_file import save_json
+
+
+# 缓存的条目只保留渲染需要的字段
+ENTRY_FIELDS = ('title', 'link', 'summary', 'published')
+
+
+class FeedCache:
+    """持久化到本地 JSON 文件的 RSS 缓存"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.feeds = {}
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.parse_seconds_saved = 0.0
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.feeds = json.load(f)
+            except Exception as e:
+                print(f"读取RSS缓存失败，忽略旧缓存: {str(e)}")
+
+    def validators(self, url, limit=None):
+        """生成条件请求头；缓存的条目是提前停止解析得到的、且不够 limit 条时不发条件请求"""
+        record = self.feeds.get(url)
+        headers = {}
+        if record and not record.get('complete', True) and limit and len(record['entries']) < limit:
+            return headers
+        if record:
+            if record.get('etag'):
+                headers['If-None-Match'] = record['etag']
+            if record.get('last_modified'):
+                headers['If-Modified-Since'] = record['last_modified']
+        return headers
+
+    def hit(self, url):
+        """源站返回 304，记录命中并返回缓存的条目"""
+        record = self.feeds.get(url)
+        if record is None:
+            return None
+        with self.lock:
+            self.hits += 1
+            self.bytes_saved += record.get('size', 0)
+            self.parse_seconds_saved += record.get('parse_seconds', 0.0)
+        return record['entries']
+
+    def store(self, url, etag, last_modified, entries, size, parse_seconds, complete=True):
+        """保存新下载的 feed；complete=False 表示只解析了前面若干条"""
+        record = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'size': size,
+            'parse_seconds': parse_seconds,
+            'complete': complete,
+            'entries': [{field: entry.get(field, '') for field in ENTRY_FIELDS} for entry in entries],
+        }
+        with self.lock:
+            self.misses += 1
+            if etag or last_modified:
+                self.feeds[url] = record
+            else:
+                # 源站不支持条件请求，缓存也无法命中
+                self.feeds.pop(url, None)
+
+    def save(self):
+        """写回磁盘（先写临时文件再替换，避免中途退出损坏缓存）"""
+        with self.lock:
+            save_json(self.path, self.feeds, ensure_ascii=False)
+
+    def report(self):
+        """本次运行的缓存统计"""
+        return (f"RSS缓存: 命中 {self.hits} 次, 未命中 {self.misses} 次, "
+                f"节省 {self.bytes_saved / 1024:.1f}KB 下载和 {self.parse_seconds_saved * 1000:.0f}ms 解析")
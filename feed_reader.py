@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式 RSS/Atom 读取
+边下载边解析，只取标题、链接、摘要和发布时间，拿到需要的条数后立即停止下载；
+不构建 feedparser 的完整对象树。遇到解析不了的 feed（非标准 XML、HTML 实体、GBK 编码等）
+由调用方退回 feedparser 处理
+"""
+
+import time
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+
+# 条目元素（RSS 2.0 / RSS 1.0 用 item，Atom 用 entry）
+ENTRY_TAGS = ('item', 'entry')
+TITLE_TAGS = ('title',)
+# 摘要按优先级：RSS description / Atom summary，都没有时用全文
+SUMMARY_TAGS = ('description', 'summary')
+CONTENT_TAGS = ('encoded', 'content')
+# 发布时间：RSS pubDate / Atom published、updated / RSS 1.0 dc:date
+DATE_TAGS = ('pubDate', 'published', 'updated', 'date')
+
+
+def local_name(tag):
+    """去掉命名空间：{http://www.w3.org/2005/Atom}entry → entry"""
+    return tag.rsplit('}', 1)[-1]
+
+
+class FeedEntry(dict):
+    """与 feedparser 条目用法相同：entry.title / entry.get('summary', '')；published 为原始时间文字"""
+
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class ParsedFeed:
+    """解析结果，和 feedparser 一样通过 .entries 访问"""
+
+    __slots__ = ('entries', 'status', 'complete')
+
+    def __init__(self, entries, status=200, complete=True):
+        self.entries = entries
+        self.status = status
+        self.complete = complete  # False 表示读够条数后提前停止，后面还有条目
+
+
+class StreamingFeedReader:
+    """增量解析器：feed(chunk) 返回 True 表示已拿到 limit 条，可以停止下载"""
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.parser = XMLPullParser(events=('start', 'end'))
+        self.entries = []
+        self.failed = False
+        self.done = False
+        self.parse_seconds = 0.0
+        self._depth = 0  # 当前在第几层条目元素里（条目里嵌套条目的 feed 按最外层计）
+
+    def feed(self, chunk):
+        if self.failed or self.done:
+            return self.done
+        start = time.perf_counter()
+        try:
+            self.parser.feed(chunk)
+            self._drain()
+        except ParseError:
+            self.failed = True
+        self.parse_seconds += time.perf_counter() - start
+        return self.done
+
+    def close(self):
+        """数据读完；返回是否解析成功"""
+        if not (self.failed or self.done):
+            start = time.perf_counter()
+            try:
+                self.parser.close()
+                self._drain()
+            except ParseError:
+                self.failed = True
+            self.parse_seconds += time.perf_counter() - start
+        return not self.failed
+
+    def _drain(self):
+        for event, elem in self.parser.read_events():
+            name = local_name(elem.tag)
+            if event == 'start':
+                if name in ENTRY_TAGS:
+                    self._depth += 1
+                continue
+
+            if name not in ENTRY_TAGS or self._depth == 0:
+                continue
+            self._depth -= 1
+            if self._depth:
+                continue
+            entry = self._extract(elem)
+            elem.clear()  # 释放已处理条目的子元素
+            if entry['title']:
+                self.entries.append(entry)
+                if self.limit and len(self.entries) >= self.limit:
+                    self.done = True
+                    return
+
+    @staticmethod
+    def _extract(elem):
+        title = link = guid = summary = content = published = ''
+        for child in elem:
+            name = local_name(child.tag)
+            if name in TITLE_TAGS and not title:
+                title = ''.join(child.itertext()).strip()
+            elif name == 'link' and not link:
+                # RSS 链接是文本，Atom 链接在 href 属性（只取 alternate）
+                if child.get('href') is not None:
+                    if child.get('rel', 'alternate') == 'alternate':
+                        link = child.get('href').strip()
+                else:
+                    link = (child.text or '').strip()
+            elif name == 'guid' and child.get('isPermaLink', 'true') == 'true':
+                guid = (child.text or '').strip()
+            elif name in SUMMARY_TAGS and not summary:
+                summary = ''.join(child.itertext()).strip()
+            elif name in CONTENT_TAGS and not content:
+                content = ''.join(child.itertext()).strip()
+            elif name in DATE_TAGS and not published:
+                published = (child.text or '').strip()
+        if not link and guid.startswith('http'):
+            link = guid
+        return FeedEntry(title=title, link=link, summary=summary or content, published=published)
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享 HTTP 传输层
+所有新闻源和推送服务共用一个连接池、DNS 缓存和响应大小上限；
+新闻源请求按接口使用自适应超时，并受整次运行的时间预算约束；
+同一期内相同的 GET 请求（规范化 URL + 请求头）只发一次，并发和后续的调用共用结果
+"""
+
+import json
+import socket
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from circuit_breaker import CircuitOpenError
+
+try:
+    # requirements.txt 带有 brotli，urllib3 会自动解压 br 编码；没装时只协商 gzip/deflate
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+
+DEFAULT_TIMEOUT = 10
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024  # 单个响应最多 5MB
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+CHUNK_SIZE = 64 * 1024
+
+
+class ResponseTooLarge(Exception):
+    """响应体超过上限"""
+
+
+class HttpError(Exception):
+    """非 2xx 响应"""
+
+
+class DeadlineExceeded(Exception):
+    """本次运行的时间预算已用完"""
+
+
+class HttpResponse:
+    """已读取完毕的响应（连接已归还连接池）"""
+
+    def __init__(self, status_code, content, headers, url, encoding=None, elapsed=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.url = url
+        self.encoding = encoding
+        self.elapsed = elapsed  # 发出请求到收到响应头的秒数
+        self._json = None
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def json(self):
+        """解析一次后缓存；合并的请求共用同一个结果，调用方不要修改"""
+        if self._json is None:
+            self._json = json.loads(self.content)
+        return self._json
+
+
+# ---------------- DNS 缓存 ----------------
+
+_original_getaddrinfo = socket.getaddrinfo
+_dns_cache = {}
+_dns_lock = threading.Lock()
+_dns_ttl = 300
+
+
+def _cached_getaddrinfo(host, port, *args, **kwargs):
+    """带 TTL 的 getaddrinfo，同一主机在一次运行内只解析一次"""
+    key = (host, port, args, tuple(sorted(kwargs.items())))
+    now = time.monotonic()
+    with _dns_lock:
+        cached = _dns_cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+    result = _original_getaddrinfo(host, port, *args, **kwargs)
+    with _dns_lock:
+        _dns_cache[key] = (now + _dns_ttl, result)
+    return result
+
+
+def enable_dns_cache(ttl=300):
+    """为整个进程开启 DNS 缓存"""
+    global _dns_ttl
+    _dns_ttl = ttl
+    socket.getaddrinfo = _cached_getaddrinfo
+
+
+# ---------------- 请求合并 ----------------
+
+class _Call:
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """相同的 key 同时只执行一次：并发的调用等待进行中的那一次，之后的调用直接复用成功的结果
+
+    失败的结果只交给当时在等待的调用，之后的调用重新执行
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.shared = 0  # 复用结果的次数
+
+    def do(self, key, func, keep=None, reusable=None):
+        """执行 func() 或复用相同 key 的结果
+
+        keep(结果) 为 False 时结果不留给之后的调用；reusable(结果) 为 False 时本次调用不复用，自己执行一次
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            if reusable is None or reusable(call.value):
+                with self.lock:
+                    self.shared += 1
+                return call.value
+            return func()
+
+        try:
+            call.value = func()
+        except Exception as e:
+            call.error = e
+            self._forget(key, call)
+            raise
+        else:
+            if keep is not None and not keep(call.value):
+                self._forget(key, call)
+            return call.value
+        finally:
+            call.event.set()
+
+    def _forget(self, key, call):
+        with self.lock:
+            if self.calls.get(key) is call:
+                del self.calls[key]
+
+    def reset(self):
+        """清空保存的结果（每期开始时调用，新的一期重新请求）"""
+        with self.lock:
+            self.calls.clear()
+            self.shared = 0
+
+
+def request_url(url):
+    """请求的规范化 URL：只把协议和主机名转小写、查询参数排序、去掉锚点；参数全部保留
+
+    不能用 normalize_url：它为识别新闻条目去掉了 from/source 等参数，而这些参数可能决定接口返回什么
+    """
+    parts = urlsplit(url.strip())
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', query, ''))
+
+
+def request_key(kind, url, headers):
+    """合并请求的 key：请求类型 + 规范化 URL + 请求头"""
+    return (kind, request_url(url), tuple(sorted((k.lower(), v) for k, v in (headers or {}).items())))
+
+
+# ---------------- HTTP 客户端 ----------------
+
+class HttpClient:
+    """基于 requests.Session 的共享客户端：按主机保持长连接、压缩协商、响应大小上限"""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, max_bytes=DEFAULT_MAX_BYTES, pool_size=10, dns_ttl=300,
+                 feed_cache=None, breaker=None, rewrite=None, latency=None, coalesce=True):
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.feed_cache = feed_cache
+        self.breaker = breaker
+        self.latency = latency  # LatencyTracker，按接口的历史响应时间决定超时
+        self.rewrite = rewrite  # 发送前改写 URL（离线基准测试指向本地服务）
+        self.deadline = None  # 时间预算的截止时刻（time.monotonic），None 表示不限制
+        self.flights = SingleFlight() if coalesce else None
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=20, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'User-Agent': DEFAULT_USER_AGENT,
+            'Accept-Encoding': ACCEPT_ENCODING,
+        })
+        if dns_ttl:
+            enable_dns_cache(dns_ttl)
+
+    def set_budget(self, seconds):
+        """从现在起的时间预算（秒），之后的新闻源请求共用剩余时间；None 或 0 取消"""
+        self.deadline = time.monotonic() + seconds if seconds else None
+
+    def remaining(self):
+        """剩余的时间预算（秒），没有预算时返回 None"""
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    def reset_shared(self):
+        """新的一期开始：之前合并保存的响应不再复用"""
+        if self.flights:
+            self.flights.reset()
+
+    def report(self):
+        shared = self.flights.shared if self.flights else 0
+        return f"请求合并: {shared} 次请求复用了相同 URL 的结果"
+
+    def request(self, method, url, circuit=True, timeout=None, **kwargs):
+        """发送请求；配置了熔断器时，熔断中的接口直接抛出 CircuitOpenError
+
+        circuit=False 时不经过熔断器，也不使用自适应超时和时间预算（例如推送接口）；
+        否则超时取该接口的历史 p99，且不超过剩余的时间预算，预算用完时抛出 DeadlineExceeded
+        """
+        breaker = self.breaker if circuit else None
+        latency = self.latency if circuit else None
+        deadline = self.deadline if circuit else None
+        timeout = timeout or self.timeout
+        if latency:
+            timeout = latency.timeout(url, timeout)
+        # 超时被预算截短时，超时不算接口的问题
+        truncated = False
+        try:
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise DeadlineExceeded(f"时间预算已用完，跳过 {url}")
+                if remaining < timeout:
+                    timeout, truncated = remaining, True
+            if breaker:
+                breaker.check(url)
+            response = self._send(method, url, timeout=timeout, deadline=deadline, **kwargs)
+        except (CircuitOpenError, DeadlineExceeded) as e:
+            metrics.note_error(e)
+            raise
+        except Exception as e:
+            metrics.note_error(e)
+            if truncated and isinstance(e, requests.Timeout):
+                raise
+            if latency and isinstance(e, requests.Timeout):
+                # 超时记在比当前超时大的分桶，下次放宽
+                latency.record_timeout(url, timeout)
+            if breaker:
+                breaker.record_failure(url)
+            raise
+        if latency:
+            latency.record(url, response.elapsed)
+        if response.status_code >= 400:
+            metrics.note_error(f"HTTP{response.status_code}")
+        if breaker:
+            if response.status_code >= 400:
+                breaker.record_failure(url)
+            else:
+                breaker.record_success(url)
+        return response
+
+    def _send(self, method, url, headers=None, timeout=None, max_bytes=None, consumer=None, deadline=None,
+              **kwargs):
+        """发送请求并读取完整响应体，超过上限或时间预算时中止下载
+
+        consumer 为回调时，200 响应的每个数据块都交给它处理，返回 True 时提前停止下载
+        （连接不再复用，content 只包含已下载的部分）
+        """
+        max_bytes = max_bytes or self.max_bytes
+        if self.rewrite:
+            url = self.rewrite(url)
+        with self.session.request(method, url, headers=headers, timeout=timeout or self.timeout,
+                                  stream=True, **kwargs) as response:
+            declared = response.headers.get('Content-Length')
+            if declared and declared.isdigit() and int(declared) > max_bytes:
+                raise ResponseTooLarge(f"{url} 响应大小 {declared} 超过上限 {max_bytes}")
+
+            chunks = []
+            received = 0
+            for chunk in response.iter_content(CHUNK_SIZE):
+                received += len(chunk)
+                if received > max_bytes:
+                    raise ResponseTooLarge(f"{url} 响应超过上限 {max_bytes} 字节")
+                # 读取超时只限制两次数据之间的间隔，持续慢速返回的响应按预算截止
+                if deadline is not None and time.monotonic() > deadline:
+                    raise DeadlineExceeded(f"{url} 下载超过时间预算")
+                chunks.append(chunk)
+                if consumer and response.status_code == 200 and consumer(chunk):
+                    break
+            metrics.add_bytes(received)
+
+            return HttpResponse(response.status_code, b''.join(chunks), response.headers,
+                                response.url, response.encoding, response.elapsed.total_seconds())
+
+    def get(self, url, **kwargs):
+        """GET 请求；相同 URL 和请求头的请求合并，只保留 200 响应给之后的调用（流式读取的请求不合并）"""
+        if self.flights is None or kwargs.get('consumer'):
+            return self.request('GET', url, **kwargs)
+        return self.flights.do(request_key('GET', url, kwargs.get('headers')),
+                               lambda: self.request('GET', url, **kwargs),
+                               keep=lambda response: response.status_code == 200)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def get_feed(self, url, headers=None, limit=None, **kwargs):
+        """下载并解析 RSS/Atom，配置了缓存时使用条件请求
+
+        边下载边流式解析，拿到 limit 条后停止下载；流式解析失败时读完整个响应交给 feedparser。
+        XML 解析模块在第一次请求 feed 时才导入，只用 JSON 接口的运行不需要加载。
+        同一个 feed 的请求合并，解析结果共用；之前的结果条数不够时重新请求
+        """
+        if self.flights is None:
+            return self._get_feed(url, headers, limit, **kwargs)
+        return self.flights.do(request_key('FEED', url, headers),
+                               lambda: self._get_feed(url, headers, limit, **kwargs),
+                               reusable=lambda feed: feed.complete or len(feed.entries) >= (limit or 0))
+
+    def _get_feed(self, url, headers=None, limit=None, **kwargs):
+        from feed_reader import FeedEntry, ParsedFeed, StreamingFeedReader
+
+        headers = dict(headers or {})
+        if self.feed_cache:
+            headers.update(self.feed_cache.validators(url, limit))
+
+        reader = StreamingFeedReader(limit)
+        response = self.get(url, headers=headers, consumer=reader.feed, **kwargs)
+        if response.status_code == 304 and self.feed_cache:
+            entries = self.feed_cache.hit(url)
+            if entries is not None:
+                return ParsedFeed([FeedEntry(entry) for entry in entries], status=304)
+        if response.status_code != 200:
+            raise HttpError(f"{url} 返回 {response.status_code}")
+
+        if reader.close() and reader.entries:
+            feed = ParsedFeed(reader.entries, complete=not reader.done)
+            parse_seconds = reader.parse_seconds
+        else:
+            feed, parse_seconds = self._parse_with_feedparser(response)
+        if self.feed_cache:
+            self.feed_cache.store(url, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                                  feed.entries, len(response.content), parse_seconds, complete=feed.complete)
+        return feed
+
+    @staticmethod
+    def _parse_with_feedparser(response):
+        """流式解析不了的 feed 交给 feedparser（只在需要时导入）"""
+        import feedparser
+        from feed_reader import FeedEntry, ParsedFeed
+
+        start = time.perf_counter()
+        parsed = feedparser.parse(response.content, response_headers={
+            'content-type': response.headers.get('Content-Type', ''),
+            'content-location': response.url,
+        })
+        entries = [FeedEntry(title=entry.get('title', ''), link=entry.get('link', ''), summary=entry.get('summary', ''),
+                             published=entry.get('published') or entry.get('updated', ''))
+                   for entry in parsed.entries]
+        return ParsedFeed(entries), time.perf_counter() - start
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_default_client():
+    """进程内共享的默认客户端"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
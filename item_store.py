@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地新闻库（SQLite）
+记录每次抓取到的新闻：首次/最近出现时间、排名、上次推送时的排名，
+增量模式下只推送上次推送之后新出现或排名上升的新闻；
+另外保存上次推送时各板块的内容指纹，内容没变（或变化太少）时整期跳过渲染和推送
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+
+from normalize import normalize_url
+
+
+# 参与记录的板块
+STORE_SECTIONS = ('hot_news', 'toutiao_hot', 'douyin_hot', 'tech_news', 'ai_news')
+
+TITLE_NOISE = re.compile(r'[^0-9a-z\u4e00-\u9fff]+')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    key TEXT PRIMARY KEY,       -- 规范化的 URL（没有 URL 时为 title: + 规范化标题）
+    title_key TEXT NOT NULL,    -- 规范化标题，URL 变化时用来识别同一条新闻
+    section TEXT NOT NULL,
+    title TEXT NOT NULL,
+    url TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    best_rank INTEGER,
+    last_rank INTEGER,
+    pushed_rank INTEGER,        -- 上次推送时的排名，未推送过为 NULL
+    last_pushed REAL
+);
+CREATE INDEX IF NOT EXISTS idx_items_title_key ON items(title_key);
+CREATE INDEX IF NOT EXISTS idx_items_last_seen ON items(last_seen);
+CREATE TABLE IF NOT EXISTS pushes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    pushed_at REAL NOT NULL,
+    items INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    section TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,  -- 上次推送时该板块新闻 key 列表（按排名）的哈希
+    keys TEXT NOT NULL,         -- 上次推送时该板块的新闻 key（JSON 列表）
+    pushed_at REAL NOT NULL
+);
+"""
+
+
+def normalize_title(title):
+    return TITLE_NOISE.sub('', (title or '').lower())
+
+
+def fingerprint(keys):
+    digest = hashlib.sha256()
+    for key in keys:
+        digest.update(key.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()[:32]
+
+
+class ItemStore:
+    """新闻库；只在主线程中使用"""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def item_key(item):
+        url = normalize_url(item.url)
+        return url or 'title:' + normalize_title(item.title)
+
+    def _lookup(self, key, title_key):
+        """先按 URL 找，找不到再按标题找（均走索引）"""
+        row = self.conn.execute("SELECT * FROM items WHERE key = ?", (key,)).fetchone()
+        if row is None and title_key:
+            row = self.conn.execute(
+                "SELECT * FROM items WHERE title_key = ? ORDER BY last_seen DESC LIMIT 1", (title_key,)).fetchone()
+        return row
+
+    def record(self, fetcher, now=None):
+        """记录本次抓取到的所有新闻"""
+        now = now or time.time()
+        with self.conn:
+            for section in STORE_SECTIONS:
+                for rank, item in enumerate(getattr(fetcher, section), 1):
+                    key = self.item_key(item)
+                    title_key = normalize_title(item.title)
+                    row = self._lookup(key, title_key)
+                    if row is None:
+                        self.conn.execute(
+                            "INSERT INTO items (key, title_key, section, title, url, first_seen, last_seen,"
+                            " best_rank, last_rank) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            (key, title_key, section, item.title, item.url, now, now, rank, rank))
+                    else:
+                        self.conn.execute(
+                            "UPDATE items SET last_seen = ?, last_rank = ?, best_rank = MIN(best_rank, ?),"
+                            " title = ? WHERE key = ?",
+                            (now, rank, rank, item.title, row['key']))
+
+    def filter_incremental(self, fetcher):
+        """只保留上次推送后新出现、或排名比上次推送时更靠前的新闻"""
+        kept = 0
+        dropped = 0
+        for section in STORE_SECTIONS:
+            fresh = []
+            for rank, item in enumerate(getattr(fetcher, section), 1):
+                row = self._lookup(self.item_key(item), normalize_title(item.title))
+                # 排名按过滤前的位置计算
+                if row is None or row['pushed_rank'] is None or rank < row['pushed_rank']:
+                    fresh.append(item)
+                else:
+                    dropped += 1
+            setattr(fetcher, section, fresh)
+            kept += len(fresh)
+        print(f"增量模式：保留 {kept} 条新内容，跳过 {dropped} 条已推送过的新闻")
+        return kept
+
+    def mark_pushed(self, fetcher, now=None):
+        """推送成功后记录每条新闻推送时的排名（本次抓取时的原始排名，不是过滤后的位置）"""
+        now = now or time.time()
+        count = 0
+        with self.conn:
+            for section in STORE_SECTIONS:
+                for item in getattr(fetcher, section):
+                    row = self._lookup(self.item_key(item), normalize_title(item.title))
+                    if row is not None:
+                        self.conn.execute("UPDATE items SET pushed_rank = last_rank, last_pushed = ? WHERE key = ?",
+                                          (now, row['key']))
+                        count += 1
+            self.conn.execute("INSERT INTO pushes (pushed_at, items) VALUES (?, ?)", (now, count))
+
+    def snapshot(self, fetcher):
+        """本次抓取到的内容：{板块: (指纹, [新闻 key])}；没抓到的板块不参与比较"""
+        snapshot = {}
+        for section in STORE_SECTIONS:
+            keys = [self.item_key(item) for item in getattr(fetcher, section)]
+            if keys:
+                snapshot[section] = (fingerprint(keys), keys)
+        return snapshot
+
+    def count_changed(self, snapshot):
+        """和上次推送相比新出现的新闻条数；指纹相同的板块直接跳过，不用逐条比较"""
+        rows = {row['section']: row for row in self.conn.execute("SELECT * FROM snapshots")}
+        changed = 0
+        for section, (digest, keys) in snapshot.items():
+            row = rows.get(section)
+            if row is None:
+                changed += len(keys)
+            elif row['fingerprint'] != digest:
+                previous = set(json.loads(row['keys']))
+                changed += sum(1 for key in keys if key not in previous)
+        return changed
+
+    def save_snapshot(self, snapshot, now=None):
+        """推送成功后保存本期内容，作为下次比较的基准"""
+        now = now or time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO snapshots (section, fingerprint, keys, pushed_at) VALUES (?, ?, ?, ?)",
+                [(section, digest, json.dumps(keys), now) for section, (digest, keys) in snapshot.items()])
+
+    def prune(self, max_age_days=365):
+        """删除太久没再出现的新闻"""
+        cutoff = time.time() - max_age_days * 86400
+        with self.conn:
+            deleted = self.conn.execute("DELETE FROM items WHERE last_seen < ?", (cutoff,)).rowcount
+        if deleted:
+            print(f"新闻库清理了 {deleted} 条过期记录")
+        return deleted
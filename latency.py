@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按接口的自适应超时
+每个接口保存一份响应时间直方图（跨运行累积），超时取该接口的 p99 并限制在上下限之间：
+快的接口（百度、wttr.in）很快放弃、尽早走备用方案，慢的接口也不会被固定的 10 秒误杀
+"""
+
+import bisect
+import json
+import os
+import threading
+
+from atomic_file import save_json
+from circuit_breaker import endpoint_key
+
+
+# 直方图分桶的上界（秒），最后一桶为超过 60 秒
+BUCKETS = (0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 4.0, 6.0, 8.0, 10.0, 15.0, 20.0, 30.0, 60.0)
+# 样本数不够时还用调用方给的默认超时
+MIN_SAMPLES = 5
+# 累计样本超过该数量时全部减半，让旧数据逐渐失去影响
+MAX_SAMPLES = 200
+
+
+class LatencyTracker:
+    """按接口（主机 + 路径）记录响应时间，给出自适应超时
+
+    记录的是发出请求到收到响应头的时间，它同时是连接耗时和首次读取等待的上界，
+    所以连接超时和读取超时都取它的 p99；超时的请求实际耗时未知、只知道超过了当时的超时，
+    记在超时所在分桶的上一个分桶里，持续超时的接口超时会逐次放宽，直到上限
+    """
+
+    def __init__(self, path, floor=3.0, ceiling=15.0, quantile=0.99):
+        self.path = path
+        self.floor = floor
+        self.ceiling = ceiling
+        self.quantile = quantile
+        self.lock = threading.Lock()
+        self.endpoints = {}  # 接口 -> 各分桶的计数（比 BUCKETS 多一个溢出桶）
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.endpoints = {key: counts for key, counts in json.load(f).items()
+                                      if len(counts) == len(BUCKETS) + 1}
+            except Exception as e:
+                print(f"读取延迟记录失败，全部重置: {str(e)}")
+
+    def record(self, url, seconds):
+        """记录一次请求的响应时间"""
+        self._add(url, bisect.bisect_left(BUCKETS, seconds))
+
+    def record_timeout(self, url, timeout):
+        """记录一次超时：响应时间大于 timeout，记在比它大的下一个分桶"""
+        self._add(url, bisect.bisect_right(BUCKETS, timeout))
+
+    def _add(self, url, idx):
+        key = endpoint_key(url)
+        with self.lock:
+            counts = self.endpoints.get(key)
+            if counts is None:
+                counts = self.endpoints[key] = [0] * (len(BUCKETS) + 1)
+            counts[idx] += 1
+            if sum(counts) > MAX_SAMPLES:
+                counts[:] = [count // 2 for count in counts]
+
+    def percentile(self, url):
+        """该接口响应时间的 p99（所在分桶的上界），样本不够时返回 None"""
+        with self.lock:
+            counts = self.endpoints.get(endpoint_key(url))
+            return self._percentile(counts) if counts else None
+
+    def _percentile(self, counts):
+        total = sum(counts)
+        if total < MIN_SAMPLES:
+            return None
+        target = total * self.quantile
+        seen = 0
+        for idx, count in enumerate(counts):
+            seen += count
+            if seen >= target:
+                break
+        return BUCKETS[idx] if idx < len(BUCKETS) else self.ceiling
+
+    def _clamp(self, seconds):
+        return min(self.ceiling, max(self.floor, seconds))
+
+    def timeout(self, url, default):
+        """该接口本次使用的超时（秒）：p99 限制在 [floor, ceiling]，没有足够记录时用 default"""
+        p99 = self.percentile(url)
+        return default if p99 is None else self._clamp(p99)
+
+    def save(self):
+        with self.lock:
+            save_json(self.path, self.endpoints)
+
+    def report(self):
+        with self.lock:
+            timeouts = [self._clamp(p99) for p99 in map(self._percentile, self.endpoints.values())
+                        if p99 is not None]
+        if not timeouts:
+            return "自适应超时: 记录不足，使用默认超时"
+        return f"自适应超时: {len(timeouts)} 个接口，{min(timeouts):.1f}~{max(timeouts):.1f} 秒"
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行指标
+记录每个抓取方法、备用方案、渲染和推送步骤的耗时、下载字节数、条数、是否走了备用方案和错误类型，
+每次运行追加一行 JSON，可选输出 Prometheus 文本格式，方便长期统计各来源的延迟
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from atomic_file import write_text
+
+
+# 当前线程正在执行的步骤（嵌套调用时为栈，HTTP 层把字节数和错误记到栈顶的步骤上）
+_local = threading.local()
+
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def add_bytes(count):
+    """把下载的字节数记到当前步骤上，没有进行中的步骤时忽略"""
+    stack = _stack()
+    if stack:
+        stack[-1].bytes += count
+
+
+def note_error(error):
+    """记录当前步骤的错误（异常或描述字符串）；同一个异常只记一次"""
+    stack = _stack()
+    if stack:
+        _record_error(stack[-1], error)
+
+
+def _record_error(record, error):
+    if isinstance(error, BaseException):
+        if error is record.last_exc:
+            return
+        record.last_exc = error
+        error = type(error).__name__
+    record.errors += 1
+    if record.error is None:
+        record.error = error
+
+
+class StepRecord:
+    """一个步骤的一次执行"""
+
+    __slots__ = ('step', 'labels', 'start', 'duration', 'bytes', 'items', 'fallback', 'backup',
+                 'error', 'errors', 'last_exc')
+
+    def __init__(self, step, labels, start, backup=False):
+        self.step = step
+        self.labels = labels
+        self.start = start
+        self.duration = 0.0
+        self.bytes = 0
+        self.items = None
+        self.fallback = None  # 主方案失败后调用的备用方案
+        self.backup = backup
+        self.error = None  # 第一个错误的类型
+        self.errors = 0
+        self.last_exc = None
+
+    def to_dict(self):
+        return {
+            'step': self.step,
+            **self.labels,
+            'start': round(self.start, 4),
+            'duration': round(self.duration, 4),
+            'bytes': self.bytes,
+            'items': self.items,
+            'fallback': self.fallback,
+            'backup': self.backup,
+            'error': self.error,
+            'errors': self.errors,
+        }
+
+
+class RunMetrics:
+    """一次运行的全部步骤记录，线程安全"""
+
+    def __init__(self, profiler=None):
+        self.started_at = datetime.now()
+        self.profiler = profiler  # --profile 时每个最外层步骤在剖析器下执行
+        self.clock = time.perf_counter()
+        self.lock = threading.Lock()
+        self.records = []
+
+    def step(self, name, backup=False, **labels):
+        """开始一个步骤，返回上下文管理器，退出时记录耗时"""
+        return _StepContext(self, name, backup, labels)
+
+    def _finish(self, record):
+        with self.lock:
+            self.records.append(record)
+
+    @property
+    def duration(self):
+        return time.perf_counter() - self.clock
+
+    def to_dict(self):
+        with self.lock:
+            records = sorted(self.records, key=lambda r: r.start)
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'duration': round(self.duration, 4),
+            'bytes': sum(r.bytes for r in records),
+            'fallbacks': sum(1 for r in records if r.backup),
+            'errors': sum(r.errors for r in records),
+            'steps': [r.to_dict() for r in records],
+        }
+
+    def save(self, path):
+        """把本次运行追加为 JSON Lines 文件中的一行"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(self.to_dict(), ensure_ascii=False) + '\n')
+
+    def prometheus(self, prefix='daily_news'):
+        """按步骤汇总，输出 Prometheus 文本格式（node_exporter textfile 采集器可直接读取）"""
+        totals = {}
+        with self.lock:
+            for r in self.records:
+                total = totals.setdefault(r.step, {'calls': 0, 'duration': 0.0, 'bytes': 0, 'items': 0,
+                                                   'fallbacks': 0, 'errors': 0})
+                total['calls'] += 1
+                total['duration'] += r.duration
+                total['bytes'] += r.bytes
+                total['items'] += r.items or 0
+                total['fallbacks'] += 1 if r.fallback else 0
+                total['errors'] += r.errors
+
+        metrics = (
+            ('calls', 'gauge', '本次运行中步骤执行次数'),
+            ('duration', 'gauge', '步骤总耗时（秒）'),
+            ('bytes', 'gauge', '步骤下载的字节数'),
+            ('items', 'gauge', '步骤产出的条数'),
+            ('fallbacks', 'gauge', '主方案失败后走备用方案的次数'),
+            ('errors', 'gauge', '步骤中出现的错误数'),
+        )
+        lines = []
+        for field, kind, help_text in metrics:
+            name = f"{prefix}_step_{field}" + ('_seconds' if field == 'duration' else '')
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for step, total in sorted(totals.items()):
+                value = total[field]
+                lines.append(f'{name}{{step="{step}"}} {round(value, 4) if isinstance(value, float) else value}')
+        lines.append(f"# HELP {prefix}_run_duration_seconds 整次运行耗时（秒）")
+        lines.append(f"# TYPE {prefix}_run_duration_seconds gauge")
+        lines.append(f"{prefix}_run_duration_seconds {round(self.duration, 4)}")
+        lines.append(f"# HELP {prefix}_run_timestamp_seconds 运行开始时间")
+        lines.append(f"# TYPE {prefix}_run_timestamp_seconds gauge")
+        lines.append(f"{prefix}_run_timestamp_seconds {int(self.started_at.timestamp())}")
+        return '\n'.join(lines) + '\n'
+
+    def save_prometheus(self, path):
+        write_text(path, self.prometheus())
+
+    def report(self):
+        summary = self.to_dict()
+        slowest = sorted(summary['steps'], key=lambda r: r['duration'], reverse=True)[:3]
+        text = (f"指标: {len(summary['steps'])} 个步骤，耗时 {summary['duration']:.2f} 秒，"
+                f"下载 {summary['bytes'] / 1024:.1f} KB，备用方案 {summary['fallbacks']} 次，"
+                f"错误 {summary['errors']} 个")
+        if slowest:
+            text += " - 最慢: " + ", ".join(f"{r['step']} {r['duration']:.2f}s" for r in slowest)
+        return text
+
+
+class _StepContext:
+    def __init__(self, metrics, name, backup, labels):
+        self.metrics = metrics
+        self.record = StepRecord(name, labels, time.perf_counter() - metrics.clock, backup)
+        self.profile = None
+
+    def __enter__(self):
+        stack = _stack()
+        if self.record.backup and stack:
+            # 在主方案里调用的备用方案
+            stack[-1].fallback = self.record.step
+        elif not stack and self.metrics.profiler:
+            # 嵌套的步骤（主方案里的备用方案）算在外层步骤里
+            self.profile = self.metrics.profiler.stage(self.record.step)
+            self.profile.__enter__()
+        stack.append(self.record)
+        return self.record
+
+    def __exit__(self, exc_type, exc, tb):
+        stack = _stack()
+        stack.pop()
+        if self.profile is not None:
+            self.profile.__exit__(exc_type, exc, tb)
+        if exc is not None:
+            _record_error(self.record, exc)
+        self.record.duration = time.perf_counter() - self.metrics.clock - self.record.start
+        self.metrics._finish(self.record)
+        return False
+
+
+def timed(step=None, items=None, labels=None, backup=False):
+    """把方法包成一个计时步骤；实例上没有 metrics 时原样执行
+
+    step 为步骤名或 step(self, *args, **kwargs) 返回步骤名，
+    items(self, 返回值) 返回本步骤产出的条数，labels(self, *args, **kwargs) 返回附加标签，
+    backup=True 表示这是备用方案
+    """
+    def decorator(func):
+        default_name = step if isinstance(step, str) else func.__name__.lstrip('_')
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            metrics = getattr(self, 'metrics', None)
+            if metrics is None:
+                return func(self, *args, **kwargs)
+            name = step(self, *args, **kwargs) if callable(step) else default_name
+            extra = labels(self, *args, **kwargs) if labels else {}
+            with metrics.step(name, backup=backup, **extra) as record:
+                value = func(self, *args, **kwargs)
+                if items:
+                    record.items = items(self, value)
+                return value
+        return wrapper
+    return decorator
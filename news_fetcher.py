@@ -5,22 +5,92 @@
 支持热点新闻和科技新闻
 """
 
+import argparse
 import os
 import json
-import re
-import requests
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
-import feedparser
+
+from circuit_breaker import CircuitBreaker
+from dedup import merge_duplicate_stories
+from feed_cache import FeedCache
+from http_client import HttpClient, get_default_client
+from item_store import ItemStore
+from latency import LatencyTracker
+from metrics import RunMetrics, note_error, timed
+from news_item import make_item, merge_rankings
+from outbox import SENT, Outbox, channel_id
+from renderer import get_default_renderer, get_renderer
+from scheduler import Scheduler, get_timezone, parse_times
+from sources import SourceError, get_default_registry, load_registry
+from topics import TopicClassifier, get_default_classifier, load_topics
+from weather_cache import WeatherCache
+
+
+# 各板块默认条数（优化数量以避免内容过长）
+DEFAULT_LIMITS = {
+    'hot_news': 6,
+    'toutiao_hot': 6,
+    'douyin_hot': 6,
+    'tech_news': 5,
+    'ai_news': 3,
+}
+
+# 并发抓取：结果属性 -> 抓取方法
+FETCH_STAGES = {
+    'hot_news': 'fetch_hot_news',
+    'toutiao_hot': 'fetch_toutiao_hot',
+    'douyin_hot': 'fetch_douyin_hot',
+    'tech_news': 'fetch_tech_news',
+}
+
+# 开启字节预算时的抓取条数：多抓一些，由渲染器按预算挑选
+BUDGET_LIMITS = {
+    'hot_news': 10,
+    'toutiao_hot': 10,
+    'douyin_hot': 10,
+    'tech_news': 10,
+    'ai_news': 8,
+}
+
+# 消息中的全部板块（订阅者可以选择其中一部分）
+SECTIONS = ('weather', 'global_hot', 'hot_news', 'toutiao_hot', 'douyin_hot', 'tech_news', 'ai_news')
+
+# 合并进全网热榜的板块
+GLOBAL_HOT_SOURCES = ('hot_news', 'toutiao_hot', 'douyin_hot')
+
+# AI 板块对应的话题（RSS 无结果时从科技新闻中按话题筛选）
+AI_TOPIC = 'ai'
+
+
+
+def _count(attr):
+    """指标：步骤结束时该板块的条数"""
+    return lambda self, _: len(getattr(self, attr))
+
+
+def _weather_count(self, _):
+    return int(self._has_result('weather', self.weather))
 
 
 class NewsFetcher:
-    def __init__(self):
+    def __init__(self, http=None, renderer=None, metrics=None, classifier=None, sources=None, weather_cache=None):
+        self.http = http or get_default_client()
+        self.sources = sources or get_default_registry()  # 新闻源注册表（sources.json）
+        self.weather_cache = weather_cache  # WeatherCache，为 None 时每次都请求
+        self.renderer = renderer or get_default_renderer()
+        self.metrics = metrics  # RunMetrics，为 None 时不记录指标
+        self.classifier = classifier or get_default_classifier()
+        self.allow_fallback = True  # 主方案失败后是否自动尝试备用方案（对冲模式下由调度方负责）
+        self.global_hot = []  # 全网热榜，由 build_global_hot() 从各热榜合成
         self.hot_news = []
         self.toutiao_hot = []
         self.douyin_hot = []
         self.tech_news = []
         self.ai_news = []
         self.weather = None
+        self.weathers = {}  # 城市 -> 天气，多订阅者时按城市去重
 
     def get_clothing_suggestion(self, temp):
         """根据温度给出穿衣建议"""
@@ -43,234 +113,120 @@ class NewsFetcher:
         except:
             return "👔 根据天气适当增减衣物"
 
+    @timed(items=_count('hot_news'))
     def fetch_hot_news(self, limit=10):
-        """获取热点新闻 - 使用知乎热榜"""
-        print("正在获取热点新闻...")
-        try:
-            # 知乎热榜 API
-            url = "https://www.zhihu.com/api/v3/feed/topstory/hot-lists/total"
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=10)
-
-            if response.status_code == 200:
-                data = response.json()
-                for item in data.get('data', [])[:limit]:
-                    target = item.get('target', {})
-                    self.hot_news.append({
-                        'title': target.get('title', ''),
-                        'url': f"https://www.zhihu.com/question/{target.get('id', '')}",
-                        'hot': item.get('detail_text', '')
-                    })
-                print(f"成功获取 {len(self.hot_news)} 条热点新闻")
-            else:
-                print(f"获取知乎热榜失败: {response.status_code}")
-                # 备用方案：使用百度热搜
-                self._fetch_baidu_hot(limit)
-        except Exception as e:
-            print(f"获取热点新闻出错: {str(e)}")
-            self._fetch_baidu_hot(limit)
-
-    def _fetch_baidu_hot(self, limit=10):
-        """备用方案：获取百度热搜"""
-        try:
-            url = "https://top.baidu.com/api/board?platform=wise&tab=realtime"
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=10)
-
-            if response.status_code == 200:
-                data = response.json()
-                for item in data.get('data', {}).get('cards', []):
-                    content = item.get('content', [])
-                    for news in content[:limit]:
-                        self.hot_news.append({
-                            'title': news.get('word', ''),
-                            'url': news.get('url', ''),
-                            'hot': news.get('hotScore', '')
-                        })
-                print(f"成功获取 {len(self.hot_news)} 条百度热搜")
-        except Exception as e:
-            print(f"获取百度热搜出错: {str(e)}")
+        """获取热点新闻（默认知乎热榜，失败时改用百度热搜）"""
+        self.fetch_section('hot_news', limit)
 
+    @timed(items=_count('toutiao_hot'))
     def fetch_toutiao_hot(self, limit=10):
         """获取今日头条热榜"""
-        print("正在获取今日头条热榜...")
-        try:
-            # 使用今日头条热榜API
-            url = "https://www.toutiao.com/hot-event/hot-board/?origin=toutiao_pc"
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=10)
-
-            if response.status_code == 200:
-                data = response.json()
-                hot_list = data.get('data', [])
-                for item in hot_list[:limit]:
-                    self.toutiao_hot.append({
-                        'title': item.get('Title', ''),
-                        'url': item.get('Url', ''),
-                        'hot': item.get('HotValue', '')
-                    })
-                print(f"成功获取 {len(self.toutiao_hot)} 条头条热榜")
-            else:
-                print(f"今日头条API返回 {response.status_code}")
-                self._fetch_toutiao_backup(limit)
-        except Exception as e:
-            print(f"获取今日头条热榜出错: {str(e)}")
-            self._fetch_toutiao_backup(limit)
-
-    def _fetch_toutiao_backup(self, limit=10):
-        """备用方案：通过RSSHub获取头条热榜"""
-        try:
-            url = "https://rsshub.app/toutiao/keyword/热点"
-            feed = feedparser.parse(url)
-            for entry in feed.entries[:limit]:
-                self.toutiao_hot.append({
-                    'title': entry.title,
-                    'url': entry.link,
-                    'hot': ''
-                })
-            print(f"备用方案成功获取 {len(self.toutiao_hot)} 条头条热榜")
-        except Exception as e:
-            print(f"头条热榜备用方案失败: {str(e)}")
+        self.fetch_section('toutiao_hot', limit)
 
+    @timed(items=_count('douyin_hot'))
     def fetch_douyin_hot(self, limit=10):
         """获取抖音热榜"""
-        print("正在获取抖音热榜...")
-        try:
-            # 使用抖音热榜API
-            url = "https://www.iesdouyin.com/web/api/v2/hotsearch/billboard/word/"
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=10)
-
-            if response.status_code == 200:
-                data = response.json()
-                word_list = data.get('word_list', [])
-                for item in word_list[:limit]:
-                    self.douyin_hot.append({
-                        'title': item.get('word', ''),
-                        'url': f"https://www.douyin.com/search/{item.get('word', '')}",
-                        'hot': item.get('hot_value', '')
-                    })
-                print(f"成功获取 {len(self.douyin_hot)} 条抖音热榜")
-            else:
-                print(f"抖音API返回 {response.status_code}")
-                self._fetch_douyin_backup(limit)
-        except Exception as e:
-            print(f"获取抖音热榜出错: {str(e)}")
-            self._fetch_douyin_backup(limit)
-
-    def _fetch_douyin_backup(self, limit=10):
-        """备用方案：通过RSSHub获取抖音热榜"""
-        try:
-            url = "https://rsshub.app/douyin/hot"
-            feed = feedparser.parse(url)
-            for entry in feed.entries[:limit]:
-                self.douyin_hot.append({
-                    'title': entry.title,
-                    'url': entry.link,
-                    'hot': ''
-                })
-            print(f"备用方案成功获取 {len(self.douyin_hot)} 条抖音热榜")
-        except Exception as e:
-            print(f"抖音热榜备用方案失败: {str(e)}")
+        self.fetch_section('douyin_hot', limit)
 
+    @timed(items=_count('tech_news'))
     def fetch_tech_news(self, limit=10):
         """获取科技新闻 - 使用 RSS 源"""
-        print("正在获取科技新闻...")
-
-        # 科技新闻 RSS 源列表
-        rss_feeds = [
-            'https://www.36kr.com/feed',  # 36氪
-            'https://sspai.com/feed',  # 少数派
-            'https://www.ifanr.com/feed',  # 爱范儿
-        ]
-
-        try:
-            for feed_url in rss_feeds:
-                try:
-                    feed = feedparser.parse(feed_url)
-                    for entry in feed.entries[:limit//len(rss_feeds) + 1]:
-                        if len(self.tech_news) >= limit:
-                            break
-                        self.tech_news.append({
-                            'title': entry.title,
-                            'url': entry.link,
-                            'summary': entry.get('summary', '')[:100] + '...'
-                        })
-                except Exception as e:
-                    print(f"获取 {feed_url} 失败: {str(e)}")
-                    continue
-
-            print(f"成功获取 {len(self.tech_news)} 条科技新闻")
-        except Exception as e:
-            print(f"获取科技新闻出错: {str(e)}")
-
-    def fetch_ai_news(self, limit=8):
-        """获取AI新闻 - 使用多个来源"""
-        print("正在获取AI新闻...")
-
-        # AI新闻来源
-        sources = [
-            {
-                'name': '机器之心',
-                'url': 'https://api.jiqizhixin.com/api/articles',
-                'type': 'api'
-            }
-        ]
-
-        try:
-            # 尝试从机器之心API获取
+        self.fetch_section('tech_news', limit)
+
+    @timed(items=_count('ai_news'))
+    def fetch_ai_news(self, limit=8, use_tech_fallback=True):
+        """获取AI新闻，RSS 源都没有结果时从科技新闻中按话题筛选"""
+        self.fetch_section('ai_news', limit)
+        if len(self.ai_news) == 0 and use_tech_fallback:
+            self._filter_ai_from_tech(limit)
+            print(f"从科技新闻中筛选出 {len(self.ai_news)} 条AI新闻")
+
+    def fetch_section(self, name, limit=10):
+        """按注册表抓取一个板块：依次请求各新闻源并合并，全部失败时改用备用源"""
+        section = self.sources.section(name)
+        if section is None:
+            return
+        print(f"正在获取{section.label}...")
+        failed = self._collect(name, section.sources, limit)
+        if failed == len(section.sources) and section.backup and self.allow_fallback:
+            self._fetch_backup(name, limit)
+        else:
+            print(f"成功获取 {len(getattr(self, name))} 条{section.label}")
+
+    @timed(step=lambda self, name, limit=10: f'fetch_{name}_backup', items=lambda self, count: count, backup=True)
+    def _fetch_backup(self, name, limit=10):
+        """备用新闻源，返回获取的条数"""
+        section = self.sources.section(name)
+        before = len(getattr(self, name))
+        self._collect(name, section.backup, limit)
+        count = len(getattr(self, name)) - before
+        print(f"备用方案获取 {count} 条{section.label}")
+        return count
+
+    def _collect(self, name, sources, limit):
+        """请求一组新闻源，结果按顺序追加到板块中，返回失败的源个数"""
+        items = getattr(self, name)
+        per_source = limit // len(sources) + 1 if sources else limit
+        failed = 0
+        for source in sources:
+            if len(items) >= limit:
+                break
             try:
-                url = "https://www.jiqizhixin.com/"
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                }
-                # 由于API可能有限制，我们使用RSS作为替代
-                rss_feeds = [
-                    'https://rsshub.app/jiqizhixin/ai',  # 机器之心AI
-                    'https://rsshub.app/36kr/search/AI',  # 36氪AI
-                ]
-
-                for feed_url in rss_feeds:
-                    try:
-                        feed = feedparser.parse(feed_url)
-                        for entry in feed.entries[:limit//len(rss_feeds) + 1]:
-                            if len(self.ai_news) >= limit:
-                                break
-                            self.ai_news.append({
-                                'title': entry.title,
-                                'url': entry.link,
-                                'summary': entry.get('summary', '')[:100] + '...'
-                            })
-                    except Exception as e:
-                        print(f"获取 {feed_url} 失败: {str(e)}")
-                        continue
-
-                # 如果RSS获取失败，使用备用的简单AI关键词搜索
-                if len(self.ai_news) == 0:
-                    # 备用：从已获取的科技新闻中筛选AI相关
-                    ai_keywords = ['AI', '人工智能', '机器学习', 'ChatGPT', 'GPT', '大模型', 'LLM', '深度学习']
-                    for news in self.tech_news[:]:
-                        if any(keyword in news['title'] for keyword in ai_keywords):
-                            if len(self.ai_news) < limit:
-                                self.ai_news.append(news)
-
-                print(f"成功获取 {len(self.ai_news)} 条AI新闻")
+                entries = source.fetch(self.http, per_source)
             except Exception as e:
-                print(f"获取AI新闻出错: {str(e)}")
-        except Exception as e:
-            print(f"AI新闻获取失败: {str(e)}")
-
+                if not isinstance(e, SourceError):  # 错误状态码已经由 HTTP 层记录
+                    note_error(e)
+                print(f"获取{source.name}失败: {str(e)}")
+                failed += 1
+                continue
+            for fields in entries:
+                if len(items) >= limit:
+                    break
+                if fields['title']:
+                    items.append(make_item(source.id, name, len(items) + 1, label=source.label, **fields))
+        return failed
+
+    @timed(items=_count('ai_news'), backup=True)
+    def _filter_ai_from_tech(self, limit=8):
+        """备用：从已获取的科技新闻中筛选AI话题"""
+        for news in self.tech_news:
+            if len(self.ai_news) >= limit:
+                break
+            if AI_TOPIC in self.classifier.classify(news):
+                self.ai_news.append(news.replace(section='ai_news', rank=len(self.ai_news) + 1))
+
+    def build_global_hot(self, limit=10):
+        """把知乎/百度、头条、抖音热榜按归一化热度合成全网热榜"""
+        self.global_hot = merge_rankings(*(getattr(self, name) for name in GLOBAL_HOT_SOURCES), limit=limit)
+        if self.global_hot:
+            print(f"全网热榜合并了 {len(self.global_hot)} 条")
+        return self.global_hot
+
+    def tag_topics(self):
+        """给所有板块的新闻打上话题标签（NewsItem.tags，存显示名称，渲染时显示在卡片上），返回各话题的条数"""
+        counts = {}
+        for name in SECTIONS:
+            if name == 'weather':
+                continue
+            tagged = []
+            for news in getattr(self, name):
+                tags = self.classifier.classify(news)
+                for tag in tags:
+                    counts[tag] = counts.get(tag, 0) + 1
+                # AI 板块的条目都是 AI 话题，卡片上不再重复标出
+                shown = [tag for tag in tags if not (name == 'ai_news' and tag == AI_TOPIC)]
+                tagged.append(news.replace(tags=tuple(self.classifier.label(tag) for tag in shown)))
+            setattr(self, name, tagged)
+        if counts:
+            print("话题分类: " + ", ".join(f"{self.classifier.label(tag)} {count} 条" for tag, count in counts.items()))
+        return counts
+
+    @timed(items=_weather_count, labels=lambda self, city="北京": {'city': city})
     def fetch_weather(self, city="北京"):
         """获取天气预报 - 使用免费API"""
         print(f"正在获取{city}天气...")
+        if self.weather_cache and self._weather_from_cache(city):
+            return
 
         try:
             # 使用免费的天气API
@@ -279,7 +235,7 @@ class NewsFetcher:
             headers = {
                 'User-Agent': 'curl/7.68.0'
             }
-            response = requests.get(url, headers=headers, timeout=10)
+            response = self.http.get(url, headers=headers, timeout=10)
 
             if response.status_code == 200:
                 data = response.json()
@@ -300,20 +256,25 @@ class NewsFetcher:
                     }
                 }
                 print(f"成功获取{city}天气")
+                self._cache_weather(city)
             else:
                 # 备用方案：使用简单的API
                 print(f"天气API返回 {response.status_code}，使用备用方案")
-                self._fetch_weather_backup(city)
+                if self.allow_fallback:
+                    self._fetch_weather_backup(city)
         except Exception as e:
+            note_error(e)
             print(f"获取天气失败: {str(e)}")
-            self._fetch_weather_backup(city)
+            if self.allow_fallback:
+                self._fetch_weather_backup(city)
 
+    @timed(items=_weather_count, labels=lambda self, city: {'city': city}, backup=True)
     def _fetch_weather_backup(self, city):
         """备用天气获取方案"""
         try:
             # 使用v1.yiketianqi.com免费API
             url = f"https://v1.yiketianqi.com/api?unescape=1&version=v91&appid=43656176&appsecret=I42og6Lm&ext=&cityid=&city={city}"
-            response = requests.get(url, timeout=10)
+            response = self.http.get(url, timeout=10)
 
             if response.status_code == 200:
                 data = response.json()
@@ -331,7 +292,9 @@ class NewsFetcher:
                     }
                 }
                 print(f"备用方案成功获取{city}天气")
+                self._cache_weather(city)
         except Exception as e:
+            note_error(e)
             print(f"备用天气方案也失败: {str(e)}")
             # 设置默认值
             self.weather = {
@@ -340,440 +303,227 @@ class NewsFetcher:
                 'tomorrow': {'temp_max': '--', 'temp_min': '--', 'weather': '数据获取失败'}
             }
 
-    def format_message(self, title="每日新闻"):
-        """格式化消息内容 - 简洁白风格"""
-        now = datetime.now()
-        date_str = now.strftime("%Y年%m月%d日")
-        time_str = now.strftime("%H:%M")
-        weekday_map = {0: "周一", 1: "周二", 2: "周三", 3: "周四", 4: "周五", 5: "周六", 6: "周日"}
-        weekday = weekday_map[now.weekday()]
-
-        # 简洁白风格 HTML 模板
-        html = f"""
-<!DOCTYPE html>
-<html>
-<head>
-<meta charset="UTF-8">
-<meta name="viewport" content="width=device-width, initial-scale=1.0">
-<style>
-    * {{
-        margin: 0;
-        padding: 0;
-        box-sizing: border-box;
-    }}
-    body {{
-        background: #f5f5f7;
-        color: #1d1d1f;
-        font-family: -apple-system, BlinkMacSystemFont, "SF Pro Display", "Segoe UI", "PingFang SC", sans-serif;
-        padding: 0;
-        margin: 0;
-        line-height: 1.6;
-    }}
-    .container {{
-        max-width: 100%;
-        background: #f5f5f7;
-    }}
-    .header {{
-        background: #fff;
-        padding: 24px 16px;
-        text-align: center;
-        border-bottom: 1px solid #e5e5e7;
-    }}
-    .header h1 {{
-        color: #1d1d1f;
-        font-size: 22px;
-        font-weight: 600;
-        margin: 0;
-    }}
-    .time-bar {{
-        background: #fff;
-        padding: 12px 16px;
-        font-size: 13px;
-        color: #86868b;
-        text-align: center;
-        border-bottom: 1px solid #e5e5e7;
-    }}
-    .section {{
-        margin-top: 12px;
-    }}
-    .section-header {{
-        background: #fff;
-        color: #1d1d1f;
-        padding: 12px 16px;
-        font-size: 17px;
-        font-weight: 600;
-        border-bottom: 1px solid #e5e5e7;
-    }}
-    .news-card {{
-        background: #fff;
-        border-bottom: 1px solid #e5e5e7;
-        padding: 16px;
-    }}
-    .news-card:active {{
-        background: #f5f5f7;
-    }}
-    .rank {{
-        display: inline-block;
-        background: #f5f5f7;
-        color: #1d1d1f;
-        font-weight: 600;
-        font-size: 12px;
-        padding: 4px 10px;
-        border-radius: 12px;
-        margin-bottom: 8px;
-        min-width: 36px;
-        text-align: center;
-    }}
-    .rank.top {{
-        background: #ff3b30;
-        color: #fff;
-    }}
-    .news-title {{
-        color: #1d1d1f;
-        font-size: 15px;
-        line-height: 1.5;
-        text-decoration: none;
-        display: block;
-        margin-bottom: 8px;
-        font-weight: 400;
-    }}
-    .hot-tag {{
-        display: inline-block;
-        background: #ff3b30;
-        color: #fff;
-        font-size: 11px;
-        padding: 2px 8px;
-        border-radius: 10px;
-        font-weight: 500;
-        margin-top: 4px;
-    }}
-    .tech-card {{
-        background: #fff;
-        border-left: 3px solid #007aff;
-        padding: 16px;
-        margin-bottom: 1px;
-    }}
-    .tech-card:active {{
-        background: #f5f5f7;
-    }}
-    .tech-number {{
-        color: #007aff;
-        font-weight: 600;
-        font-size: 13px;
-        margin-bottom: 8px;
-    }}
-    .tech-title {{
-        color: #1d1d1f;
-        font-size: 15px;
-        font-weight: 500;
-        line-height: 1.5;
-        margin-bottom: 8px;
-    }}
-    .tech-title a {{
-        color: #1d1d1f;
-        text-decoration: none;
-    }}
-    .tech-summary {{
-        color: #86868b;
-        font-size: 13px;
-        line-height: 1.5;
-        margin-bottom: 8px;
-    }}
-    .read-more {{
-        color: #007aff;
-        font-size: 13px;
-        font-weight: 500;
-        text-decoration: none;
-    }}
-    .weather-card {{
-        background: linear-gradient(135deg, #007aff 0%, #5ac8fa 100%);
-        padding: 20px 16px;
-        color: #fff;
-        margin-top: 12px;
-    }}
-    .weather-title {{
-        font-size: 17px;
-        font-weight: 600;
-        margin-bottom: 16px;
-        text-align: center;
-    }}
-    .weather-grid {{
-        display: grid;
-        grid-template-columns: 1fr 1fr;
-        gap: 12px;
-    }}
-    .weather-item {{
-        background: rgba(255, 255, 255, 0.15);
-        padding: 16px;
-        border-radius: 12px;
-        text-align: center;
-        backdrop-filter: blur(10px);
-    }}
-    .weather-day {{
-        font-size: 13px;
-        opacity: 0.9;
-        margin-bottom: 8px;
-    }}
-    .weather-temp {{
-        font-size: 32px;
-        font-weight: 600;
-        margin: 8px 0;
-    }}
-    .weather-desc {{
-        font-size: 14px;
-        opacity: 0.9;
-    }}
-    .ai-card {{
-        background: #fff;
-        border-left: 3px solid #ff9500;
-        padding: 16px;
-        margin-bottom: 1px;
-    }}
-    .ai-card:active {{
-        background: #f5f5f7;
-    }}
-    .footer {{
-        background: #fff;
-        border-top: 1px solid #e5e5e7;
-        padding: 20px 16px;
-        text-align: center;
-        color: #86868b;
-        font-size: 12px;
-        margin-top: 12px;
-    }}
-    .footer-text {{
-        color: #86868b;
-        margin: 4px 0;
-    }}
-</style>
-</head>
-<body>
-<div class="container">
-    <div class="header">
-        <h1>{title}</h1>
-    </div>
-    <div class="time-bar">
-        {date_str} {weekday} {time_str}
-    </div>
-"""
+    def _weather_from_cache(self, city):
+        """使用缓存的天气；缓存已过期但还在可用期内时先用旧数据，同时在后台刷新"""
+        weather, fresh = self.weather_cache.get(city)
+        if weather is None:
+            return False
+        self.weather = weather
+        if fresh:
+            print(f"使用缓存的{city}天气")
+        else:
+            print(f"使用缓存的{city}天气，后台刷新中")
+            self.weather_cache.revalidate(city, lambda: self._load_weather(city))
+        return True
+
+    def _load_weather(self, city):
+        """不经过缓存重新获取天气，失败时返回 None"""
+        scratch = self._spawn()
+        scratch.weather_cache = None
+        scratch.fetch_weather(city)
+        return scratch.weather if self._has_result('weather', scratch.weather) else None
+
+    def _cache_weather(self, city):
+        if self.weather_cache:
+            self.weather_cache.store(city, self.weather)
+
+    def fetch_all(self, city="北京", limits=None, deadline=30, hedge_delay=None, cities=None, sections=None):
+        """并发获取所有板块，到达截止时间后只保留已完成的板块
+
+        hedge_delay 为秒数（或 {板块: 秒数}）时启用对冲：主方案在该时间内没有结果就同时请求备用方案
+        cities 为多个城市时每个城市只获取一次天气，结果保存在 self.weathers
+        sections 为要获取的板块（默认全部），没人订阅的板块不请求
+        """
+        limits = {**DEFAULT_LIMITS, **(limits or {})}
+        cities = list(dict.fromkeys(cities)) if cities is not None else ([city] if city else [])
+        print(f"并发获取所有板块，截止时间 {deadline} 秒...")
+        stop_at = time.monotonic() + deadline
+
+        workers = min(len(FETCH_STAGES) + 1 + len(cities), 16)
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fetch')
+        futures = {}
+        for attr, method in FETCH_STAGES.items():
+            if sections is None or attr in sections:
+                futures[attr] = self._submit_stage(executor, attr, method, hedge_delay, limit=limits[attr])
+        # AI新闻只依赖科技新闻这一项（关键词筛选的备用方案）
+        if sections is None or 'ai_news' in sections:
+            futures['ai_news'] = executor.submit(self._run_ai_stage, futures.get('tech_news'), stop_at,
+                                                 limits['ai_news'])
+        weather_futures = {
+            c: self._submit_stage(executor, 'weather', 'fetch_weather', hedge_delay, city=c) for c in cities
+        }
 
-        # 天气预报部分
-        if self.weather:
-            w = self.weather
-            # 获取穿衣建议
-            clothing = self.get_clothing_suggestion(w['today']['temp'])
-            html += f"""
-    <div class="weather-card">
-        <div class="weather-title">🌤️ {w['city']} 天气预报</div>
-        <div class="weather-grid">
-            <div class="weather-item">
-                <div class="weather-day">今天</div>
-                <div class="weather-temp">{w['today']['temp']}°</div>
-                <div class="weather-desc">{w['today']['weather']}</div>
-                <div class="weather-desc">湿度 {w['today']['humidity']}%</div>
-            </div>
-            <div class="weather-item">
-                <div class="weather-day">明天</div>
-                <div class="weather-temp">{w['tomorrow']['temp_min']}~{w['tomorrow']['temp_max']}°</div>
-                <div class="weather-desc">{w['tomorrow']['weather']}</div>
-            </div>
-        </div>
-        <div style="background: rgba(255, 255, 255, 0.2); padding: 12px; border-radius: 12px; margin-top: 12px; text-align: center; font-size: 14px; backdrop-filter: blur(10px);">
-            <div style="opacity: 0.9;">穿衣建议</div>
-            <div style="font-weight: 600; margin-top: 4px;">{clothing}</div>
-        </div>
-    </div>
-"""
+        done, _ = wait([*futures.values(), *weather_futures.values()],
+                       timeout=max(0, stop_at - time.monotonic()))
+        for attr, future in futures.items():
+            value = self._stage_result(attr, future, done)
+            if value is not None:
+                setattr(self, attr, value)
+        for c, future in weather_futures.items():
+            value = self._stage_result(f"{c}天气", future, done)
+            if value is not None:
+                self.weathers[c] = value
+        if cities:
+            self.weather = self.weathers.get(cities[0])
+        # 不等待超时的线程，直接用已完成的结果继续
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit_stage(self, executor, attr, method, hedge_delay, **kwargs):
+        """提交一个板块的抓取任务，配置了对冲延迟且有备用方案时走对冲"""
+        delay = hedge_delay.get(attr) if isinstance(hedge_delay, dict) else hedge_delay
+        if delay is not None and self._has_backup(attr):
+            return executor.submit(self._run_hedged, attr, method, delay, **kwargs)
+        return executor.submit(self._run_stage, attr, method, **kwargs)
+
+    @staticmethod
+    def _stage_result(name, future, done):
+        """取出已完成任务的结果，超时或出错时返回 None"""
+        if future not in done:
+            print(f"{name} 超过截止时间，本次跳过")
+        elif future.exception() is not None:
+            print(f"{name} 获取出错: {future.exception()}")
+        else:
+            return future.result()
+        return None
+
+    def _spawn(self):
+        """创建临时实例，并发时每个板块写入各自的实例，互不干扰"""
+        return NewsFetcher(http=self.http, renderer=self.renderer, metrics=self.metrics, classifier=self.classifier,
+                           sources=self.sources, weather_cache=self.weather_cache)
+
+    def _run_stage(self, attr, method, **kwargs):
+        """在临时实例上执行一个抓取方法，返回对应的结果"""
+        scratch = self._spawn()
+        getattr(scratch, method)(**kwargs)
+        return getattr(scratch, attr)
+
+    @staticmethod
+    def _has_result(attr, value):
+        """判断一个板块是否拿到了有效结果"""
+        if attr == 'weather':
+            return bool(value) and value['today']['weather'] != '数据获取失败'
+        return bool(value)
+
+    def _has_backup(self, attr):
+        """该板块是否有备用方案（天气固定有，其余看注册表）"""
+        return attr == 'weather' or self.sources.has_backup(attr)
+
+    def _run_backup(self, attr, **kwargs):
+        """在临时实例上执行备用方案"""
+        scratch = self._spawn()
+        if attr == 'weather':
+            scratch._fetch_weather_backup(kwargs['city'])
+        else:
+            scratch._fetch_backup(attr, kwargs['limit'])
+        return getattr(scratch, attr)
+
+    def _run_hedged(self, attr, method, delay, **kwargs):
+        """对冲请求：主方案 delay 秒内没有结果就同时发起备用方案，采用先成功的一方
+
+        已发出的 HTTP 请求无法中断，落后的一方结果直接丢弃
+        """
+        def run_primary():
+            scratch = self._spawn()
+            scratch.allow_fallback = False
+            getattr(scratch, method)(**kwargs)
+            return getattr(scratch, attr)
+
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix=f'hedge-{attr}')
+        try:
+            primary = executor.submit(run_primary)
+            done, _ = wait([primary], timeout=delay)
+            if primary in done and primary.exception() is None and self._has_result(attr, primary.result()):
+                return primary.result()
+
+            if primary not in done:
+                print(f"{attr} 主方案 {delay} 秒内未返回，同时请求备用方案")
+            backup = executor.submit(self._run_backup, attr, **kwargs)
+            pending = {primary, backup}
+            result = None
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is not None:
+                        continue
+                    value = future.result()
+                    if self._has_result(attr, value):
+                        if future is backup:
+                            print(f"{attr} 采用备用方案的结果")
+                        return value
+                    if future is backup or result is None:
+                        # 都失败时保留备用方案的兜底数据（如天气的默认值）
+                        result = value
+            return result
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run_ai_stage(self, tech_future, stop_at, limit):
+        """获取AI新闻，RSS无结果时才等待科技新闻完成再筛选"""
+        scratch = self._spawn()
+        scratch.fetch_ai_news(limit=limit, use_tech_fallback=False)
+        if not scratch.ai_news and tech_future is not None:
+            try:
+                scratch.tech_news = list(tech_future.result(timeout=max(0, stop_at - time.monotonic())))
+            except Exception as e:
+                print(f"等待科技新闻失败，跳过AI关键词筛选: {str(e)}")
+                return scratch.ai_news
+            scratch._filter_ai_from_tech(limit)
+            print(f"从科技新闻中筛选出 {len(scratch.ai_news)} 条AI新闻")
+        return scratch.ai_news
 
-        # 热点新闻部分
-        if self.hot_news:
-            html += """
-    <div class="section">
-        <div class="section-header">🔥 热点新闻</div>
-"""
-            for idx, news in enumerate(self.hot_news[:10], 1):
-                # 格式化热度
-                hot_tag = ""
-                if news['hot']:
-                    try:
-                        hot_num = int(str(news['hot']).replace('万', '0000'))
-                        if hot_num >= 10000:
-                            hot_tag = f'<span class="hot-tag">🔥 {hot_num//10000}万热度</span>'
-                        else:
-                            hot_tag = f'<span class="hot-tag">🔥 {news["hot"]}</span>'
-                    except:
-                        hot_tag = f'<span class="hot-tag">🔥 {news["hot"]}</span>'
-
-                # 前三名特殊标记
-                rank_class = "top" if idx <= 3 else ""
-
-                html += f"""
-        <div class="news-card">
-            <span class="rank {rank_class}">#{idx}</span>
-            <a href="{news['url']}" class="news-title">{news['title']}</a>
-            {hot_tag}
-        </div>
-"""
-            html += """
-    </div>
-"""
+    def _renderer(self, fmt):
+        return self.renderer if fmt == 'html' else get_renderer(fmt)
 
-        # 今日头条热榜部分
-        if self.toutiao_hot:
-            html += """
-    <div class="section">
-        <div class="section-header" style="background: linear-gradient(90deg, #ff6b35, #f7931e);">📱 今日头条</div>
-"""
-            for idx, news in enumerate(self.toutiao_hot[:10], 1):
-                # 格式化热度
-                hot_tag = ""
-                if news['hot']:
-                    try:
-                        hot_num = int(str(news['hot']).replace('万', '0000'))
-                        if hot_num >= 10000:
-                            hot_tag = f'<span class="hot-tag">🔥 {hot_num//10000}万</span>'
-                        else:
-                            hot_tag = f'<span class="hot-tag">🔥 {news["hot"]}</span>'
-                    except:
-                        if news['hot']:
-                            hot_tag = f'<span class="hot-tag">🔥 {news["hot"]}</span>'
-
-                # 前三名特殊标记
-                rank_class = "top" if idx <= 3 else ""
-
-                html += f"""
-        <div class="news-card">
-            <span class="rank {rank_class}">#{idx}</span>
-            <a href="{news['url']}" class="news-title">{news['title']}</a>
-            {hot_tag}
-        </div>
-"""
-            html += """
-    </div>
-"""
+    @timed(labels=lambda self, title="每日新闻", sections=None, weather=None, fmt='html': {'format': fmt})
+    def format_message(self, title="每日新闻", sections=None, weather=None, fmt='html'):
+        """格式化消息内容 - 简洁白风格
 
-        # 抖音热榜部分
-        if self.douyin_hot:
-            html += """
-    <div class="section">
-        <div class="section-header" style="background: linear-gradient(90deg, #000, #333);">🎵 抖音热榜</div>
-"""
-            for idx, news in enumerate(self.douyin_hot[:10], 1):
-                # 格式化热度
-                hot_tag = ""
-                if news['hot']:
-                    try:
-                        hot_num = int(str(news['hot']))
-                        if hot_num >= 10000:
-                            hot_tag = f'<span class="hot-tag">🔥 {hot_num//10000}万</span>'
-                        else:
-                            hot_tag = f'<span class="hot-tag">🔥 {hot_num}</span>'
-                    except:
-                        if news['hot']:
-                            hot_tag = f'<span class="hot-tag">🔥 {news["hot"]}</span>'
-
-                # 前三名特殊标记
-                rank_class = "top" if idx <= 3 else ""
-
-                html += f"""
-        <div class="news-card">
-            <span class="rank {rank_class}">#{idx}</span>
-            <a href="{news['url']}" class="news-title">{news['title']}</a>
-            {hot_tag}
-        </div>
-"""
-            html += """
-    </div>
-"""
+        sections 为要显示的板块（默认全部），weather 为指定城市的天气（默认 self.weather），
+        fmt 为消息格式：html / markdown / text
+        """
+        sections = SECTIONS if sections is None else sections
+        return self._renderer(fmt).render(self, title, sections, weather or self.weather)
 
-        # 科技新闻部分
-        if self.tech_news:
-            html += """
-    <div class="section">
-        <div class="section-header">💻 科技资讯</div>
-"""
-            for idx, news in enumerate(self.tech_news[:10], 1):
-                # 清理摘要（缩短长度以减少总内容）
-                summary = ""
-                if news.get('summary'):
-                    summary = news['summary'].strip()
-                    summary = re.sub(r'<[^>]+>', '', summary)
-                    if len(summary) > 50:
-                        summary = summary[:50] + "..."
-
-                html += f"""
-        <div class="tech-card">
-            <div class="tech-number">[{idx:02d}]</div>
-            <div class="tech-title">
-                <a href="{news['url']}">{news['title']}</a>
-            </div>
-"""
-                # 只在前5条显示摘要
-                if summary and idx <= 5:
-                    html += f"""
-            <div class="tech-summary">{summary}</div>
-"""
-                html += f"""
-            <a href="{news['url']}" class="read-more">阅读全文 →</a>
-        </div>
-"""
-            html += """
-    </div>
-"""
+    @timed(items=lambda self, parts: len(parts))
+    def format_messages(self, title="每日新闻", sections=None, weather=None, budget=None, fmt='html'):
+        """按字节预算格式化消息，返回 [(标题, 内容)]；超出预算时拆成多条编号消息"""
+        if not budget:
+            return [(title, self.format_message(title, sections, weather, fmt=fmt))]
+        sections = SECTIONS if sections is None else sections
+        return self._renderer(fmt).render_parts(self, title, sections, weather or self.weather, budget)
 
-        # AI新闻部分
-        if self.ai_news:
-            html += """
-    <div class="section">
-        <div class="section-header">🤖 AI 前沿</div>
-"""
-            for idx, news in enumerate(self.ai_news[:8], 1):
-                # 清理摘要（缩短长度）
-                summary = ""
-                if news.get('summary'):
-                    summary = news['summary'].strip()
-                    summary = re.sub(r'<[^>]+>', '', summary)
-                    if len(summary) > 50:
-                        summary = summary[:50] + "..."
-
-                html += f"""
-        <div class="ai-card">
-            <div class="tech-number">[{idx:02d}]</div>
-            <div class="tech-title">
-                <a href="{news['url']}">{news['title']}</a>
-            </div>
-"""
-                # 只在前3条显示摘要
-                if summary and idx <= 3:
-                    html += f"""
-            <div class="tech-summary">{summary}</div>
-"""
-                html += f"""
-            <a href="{news['url']}" class="read-more">阅读全文 →</a>
-        </div>
-"""
-            html += """
-    </div>
-"""
 
-        # 底部
-        html += """
-    <div class="footer">
-        <div class="footer-text">每日 08:00 / 20:00 自动推送</div>
-    </div>
-</div>
-</body>
-</html>
-"""
-        return html
+class PushError(Exception):
+    """推送渠道返回失败；retry=False 表示重试也不会成功（如不支持的推送类型）"""
+
+    def __init__(self, message, retry=True):
+        super().__init__(message)
+        self.retry = retry
 
 
 class MessagePusher:
     """消息推送器"""
 
-    def __init__(self, push_type, push_key):
+    # 各推送渠道单条消息的字节上限
+    BUDGETS = {
+        'serverchan': 32 * 1024,
+        'pushplus': 20000,
+    }
+
+    # 各推送渠道使用的消息格式：Server酱的 desp 是 Markdown，PushPlus 用 html 模板，Webhook 发纯文本
+    FORMATS = {
+        'serverchan': 'markdown',
+        'pushplus': 'html',
+        'webhook': 'text',
+    }
+
+    def __init__(self, push_type, push_key, http=None, metrics=None, timeout=10, fmt=None):
         self.push_type = push_type
         self.push_key = push_key
+        self.fmt = fmt  # 订阅者指定的消息格式，为 None 时按渠道默认
+        self.http = http or get_default_client()
+        self.metrics = metrics
+        self.timeout = timeout
 
     def push_server_chan(self, title, content):
         """Server酱推送"""
@@ -782,8 +532,8 @@ class MessagePusher:
             "title": title,
             "desp": content
         }
-        response = requests.post(url, data=data)
-        return response.json()
+        response = self.http.post(url, data=data, circuit=False, timeout=self.timeout)
+        return self._result(response)
 
     def push_pushplus(self, title, content):
         """PushPlus推送"""
@@ -794,64 +544,427 @@ class MessagePusher:
             "content": content,
             "template": "html"
         }
-        response = requests.post(url, json=data)
+        response = self.http.post(url, json=data, circuit=False, timeout=self.timeout)
+        return self._result(response)
+
+    def push_webhook(self, title, content, idempotency_key=None):
+        """通用 Webhook 推送：push_key 为地址，POST JSON，返回 2xx 即成功"""
+        headers = {'Idempotency-Key': idempotency_key} if idempotency_key else None
+        response = self.http.post(self.push_key, json={"title": title, "content": content, "format": self.format},
+                                  headers=headers, circuit=False, timeout=self.timeout)
+        if not 200 <= response.status_code < 300:
+            status = response.status_code
+            raise PushError(f"HTTP {status}", retry=status >= 500 or status == 429)
+        return {'code': response.status_code}
+
+    @staticmethod
+    def _result(response):
+        """渠道返回的 JSON；HTTP 出错时抛出 PushError（5xx 和 429 可以重试）"""
+        if response.status_code != 200:
+            status = response.status_code
+            raise PushError(f"HTTP {status}", retry=status >= 500 or status == 429)
         return response.json()
 
+    @property
+    def budget(self):
+        """当前渠道的字节上限"""
+        return self.BUDGETS.get(self.push_type.lower())
+
+    @property
+    def format(self):
+        """当前消息的格式：订阅者指定的格式，否则按渠道默认"""
+        return self.fmt or self.FORMATS.get(self.push_type.lower(), 'html')
+
+    @timed(step='push', items=lambda self, _: 1, labels=lambda self, title, content, **_: {'channel': self.push_type})
+    def send(self, title, content, idempotency_key=None):
+        """推送一条消息，渠道返回失败时抛出 PushError；idempotency_key 供支持幂等的渠道（Webhook）去重"""
+        if self.push_type.lower() == "serverchan":
+            result = self.push_server_chan(title, content)
+            print(f"Server酱推送结果: {result}")
+            ok = result.get('code') == 0
+        elif self.push_type.lower() == "pushplus":
+            result = self.push_pushplus(title, content)
+            print(f"PushPlus推送结果: {result}")
+            ok = result.get('code') == 200
+        elif self.push_type.lower() == "webhook":
+            result = self.push_webhook(title, content, idempotency_key)
+            print(f"Webhook推送结果: {result}")
+            ok = True
+        else:
+            raise PushError(f"不支持的推送类型: {self.push_type}", retry=False)
+        if not ok:
+            raise PushError(f"{self.push_type} 返回 {result.get('code')}: {result.get('message') or result.get('msg')}")
+
     def push(self, title, content):
-        """统一推送接口"""
+        """统一推送接口，返回是否成功"""
         try:
-            if self.push_type.lower() == "serverchan":
-                result = self.push_server_chan(title, content)
-                print(f"Server酱推送结果: {result}")
-            elif self.push_type.lower() == "pushplus":
-                result = self.push_pushplus(title, content)
-                print(f"PushPlus推送结果: {result}")
-            else:
-                print(f"不支持的推送类型: {self.push_type}")
-                return False
+            self.send(title, content)
             return True
         except Exception as e:
             print(f"推送失败: {str(e)}")
             return False
 
 
+def parse_channels(text):
+    """"serverchan:SendKey,pushplus:Token,webhook:https://..." → [(推送类型, key)]"""
+    channels = []
+    for part in filter(None, (p.strip() for p in text.split(','))):
+        push_type, _, push_key = part.partition(':')
+        if not push_key:
+            raise ValueError(f"推送渠道格式错误（应为 类型:key）: {part}")
+        channels.append((push_type.strip(), push_key.strip()))
+    return channels
+
+
+def channel_format(sub):
+    """订阅者的消息格式：可在订阅者配置中用 format 指定，默认按推送渠道"""
+    return sub.get('format') or MessagePusher.FORMATS.get(sub['push_type'].lower(), 'html')
+
+
+def load_subscribers(path, default_city="北京"):
+    """读取订阅者文件（JSON 数组），每个订阅者可单独设置推送方式、城市和板块
+
+    一个订阅者要同时推送到多个渠道时用 channels 列出（每项含 push_type、push_key，可选 format），
+    展开后每个渠道一项
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        raw = json.load(f)
+
+    subscribers = []
+    for idx, item in enumerate(raw, 1):
+        channels = item.get('channels') or [item]
+        if not all(channel.get('push_key') for channel in channels):
+            print(f"订阅者 #{idx} 缺少 push_key，已跳过")
+            continue
+        sections = item.get('sections')
+        if sections is not None:
+            unknown = [name for name in sections if name not in SECTIONS]
+            if unknown:
+                print(f"订阅者 #{idx} 包含未知板块 {unknown}，已忽略")
+            sections = tuple(name for name in sections if name in SECTIONS)
+        name = item.get('name', f"订阅者{idx}")
+        for channel in channels:
+            push_type = channel.get('push_type', 'pushplus')
+            subscribers.append({
+                'name': f"{name}/{push_type}" if len(channels) > 1 else name,
+                'push_type': push_type,
+                'push_key': channel['push_key'],
+                'format': channel.get('format') or item.get('format'),
+                'city': item.get('city', default_city),
+                'sections': sections,
+            })
+    print(f"共 {len(subscribers)} 个推送目标")
+    return subscribers
+
+
+def push_to_subscribers(fetcher, subscribers, title, http=None, concurrency=4, budget=None, metrics=None,
+                        not_before=None, outbox=None, timeout=10):
+    """按订阅者渲染并推送；城市、板块和字节预算相同的订阅者共用一份渲染结果
+
+    budget 为 None 时不限制大小，为 'auto' 时按各渠道的上限，为数字时使用该字节数；
+    not_before 为时间戳时，渲染完成后等到该时刻再推送（常驻模式提前抓取、准时推送）；
+    渲染结果先写入 outbox（默认为内存中的临时发件箱），之前运行留下的未送达消息一起重发
+    """
+    def resolve_budget(sub):
+        if budget == 'auto':
+            return MessagePusher(sub['push_type'], sub['push_key'], http=http).budget
+        return budget
+
+    def render_key(sub):
+        # 每种格式每期只渲染一次，城市、板块、预算相同的订阅者共用
+        return (sub['city'], sub['sections'], resolve_budget(sub), channel_format(sub))
+
+    rendered = {}
+    for sub in subscribers:
+        key = render_key(sub)
+        if key not in rendered:
+            weather = fetcher.weathers.get(sub['city'])
+            sections = SECTIONS if sub['sections'] is None else sub['sections']
+            if weather is None:
+                # 该城市天气没拿到，不能用其他城市的天气代替
+                sections = tuple(name for name in sections if name != 'weather')
+            rendered[key] = fetcher.format_messages(title, sections=sections, weather=weather, budget=key[2],
+                                                    fmt=key[3])
+
+    # 先写入发件箱再推送，推送失败的消息下次运行不用重新抓取和渲染
+    outbox = outbox or Outbox(':memory:')
+    queued = [[outbox.enqueue(sub['push_type'], sub['push_key'], part_title, content, subscriber=sub['name'],
+                              fmt=channel_format(sub))
+               for part_title, content in rendered[render_key(sub)]] for sub in subscribers]
+
+    if not_before and not_before > time.time():
+        print(f"渲染完成，等待 {not_before - time.time():.0f} 秒后准时推送")
+        time.sleep(max(0, not_before - time.time()))
+
+    deliver_outbox(outbox, subscribers, http=http, metrics=metrics, concurrency=concurrency, timeout=timeout)
+    statuses = outbox.statuses([key for keys in queued for key in keys])
+    results = [all(statuses.get(key) == SENT for key in keys) for keys in queued]
+
+    for sub, success in zip(subscribers, results):
+        if not success:
+            print(f"❌ {sub['name']} 推送失败")
+    print(f"渲染 {len(rendered)} 个版本，推送成功 {sum(results)}/{len(subscribers)}")
+    return results
+
+
+def deliver_outbox(outbox, subscribers, http=None, metrics=None, concurrency=4, timeout=10):
+    """推送发件箱中所有待发的消息，返回 (送达数, 仍待发数)
+
+    发件箱只保存渠道标识，推送 key 按当前的订阅者配置找回；已经不在配置中的渠道不再推送
+    """
+    keys = {channel_id(sub['push_type'], sub['push_key']): sub['push_key'] for sub in subscribers}
+
+    def send(message):
+        push_key = keys.get(message['channel'])
+        if push_key is None:
+            raise PushError("渠道已不在当前配置中", retry=False)
+        pusher = MessagePusher(message['push_type'], push_key, http=http, metrics=metrics, timeout=timeout,
+                               fmt=message['format'])
+        pusher.send(message['title'], message['content'], idempotency_key=message['id'])
+
+    return outbox.deliver(send, concurrency=concurrency)
+
+
+def required_sections(subscribers, global_hot=True):
+    """订阅者用到的全部板块；全网热榜由各热榜合成，需要一起抓取"""
+    wanted = set()
+    for sub in subscribers:
+        wanted.update(SECTIONS if sub['sections'] is None else sub['sections'])
+    if global_hot and 'global_hot' in wanted:
+        wanted.update(GLOBAL_HOT_SOURCES)
+    return wanted
+
+
+def edition_title(hour):
+    """按推送时刻决定标题"""
+    return "早间新闻" if hour < 12 else "晚间新闻"
+
+
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="每日新闻推送到微信")
+    parser.add_argument('--daemon', action='store_true', help="常驻运行，按 PUSH_TIMES 定时推送")
+    parser.add_argument('--retry-outbox', action='store_true', help="只重发发件箱中未送达的消息，不抓取新闻")
+    parser.add_argument('--profile', action='store_true',
+                        help="按步骤采集 CPU 和内存，结果写入 PROFILE_DIR（抓取和推送改为顺序执行）")
+    args = parser.parse_args()
+
     # 从环境变量获取配置
-    push_type = os.getenv('PUSH_TYPE', 'pushplus')  # serverchan 或 pushplus
+    push_type = os.getenv('PUSH_TYPE', 'pushplus')  # serverchan、pushplus 或 webhook（PUSH_KEY 为地址）
     push_key = os.getenv('PUSH_KEY', '')
     city = os.getenv('CITY', '北京')  # 天气城市，默认北京
-
-    if not push_key:
+    subscribers_file = os.getenv('SUBSCRIBERS_FILE', '')  # 多订阅者配置文件，设置后忽略 PUSH_TYPE/PUSH_KEY
+    push_channels = os.getenv('PUSH_CHANNELS', '')  # 同时推送到多个渠道：serverchan:key,pushplus:token,webhook:地址
+    push_concurrency = int(os.getenv('PUSH_CONCURRENCY', '4'))  # 多订阅者时同时推送的数量
+    dedup = os.getenv('DEDUP', '1') == '1'  # 跨来源合并重复新闻
+    incremental = os.getenv('INCREMENTAL', '0') == '1'  # 只推送上次推送后新出现或排名上升的新闻
+    min_changed = int(os.getenv('MIN_CHANGED_ITEMS', '1'))  # 和上次推送相比至少有几条新新闻才推送，0 关闭检测
+    retention_days = int(os.getenv('ITEM_RETENTION_DAYS', '365'))  # 新闻库保留天数
+    message_budget = os.getenv('MESSAGE_BUDGET', '')  # 单条消息字节上限：auto 按渠道，数字为字节数，留空不限制
+    fetch_mode = os.getenv('FETCH_MODE', 'concurrent')  # concurrent 或 sequential
+    fetch_deadline = float(os.getenv('FETCH_DEADLINE', '30'))  # 并发抓取的总截止时间（秒）
+    run_budget = float(os.getenv('RUN_BUDGET', '120'))  # 每期所有新闻源请求共用的时间预算（秒），0 不限制
+    timeout_floor = float(os.getenv('TIMEOUT_FLOOR', '3'))  # 自适应超时的下限（秒）
+    timeout_ceiling = float(os.getenv('TIMEOUT_CEILING', '15'))  # 自适应超时的上限（秒），0 关闭自适应超时
+    hedge_delay = os.getenv('HEDGE_DELAY', '')  # 主方案超过该秒数未返回就同时请求备用方案，留空关闭
+    max_bytes = int(os.getenv('HTTP_MAX_BYTES', str(5 * 1024 * 1024)))  # 单个响应大小上限
+    state_dir = os.getenv('STATE_DIR', '.news_state')  # 两次运行之间保存的状态（缓存等）
+    breaker_threshold = int(os.getenv('BREAKER_THRESHOLD', '2'))  # 连续失败几次后熔断
+    breaker_cooldown = float(os.getenv('BREAKER_COOLDOWN', '86400'))  # 熔断后多少秒再探测
+    metrics_file = os.getenv('METRICS_FILE', os.path.join(state_dir, 'metrics.jsonl'))  # 每次运行追加一行 JSON 指标
+    prometheus_file = os.getenv('PROMETHEUS_FILE', '')  # Prometheus 文本格式的指标文件，留空不输出
+    topics_file = os.getenv('TOPICS_FILE', '')  # 自定义话题词表（JSON），覆盖或补充默认词表
+    global_hot_limit = int(os.getenv('GLOBAL_HOT', '10'))  # 全网热榜条数，0 关闭
+    sources_file = os.getenv('SOURCES_FILE', '')  # 自定义新闻源配置，默认为项目中的 sources.json
+    weather_ttl = float(os.getenv('WEATHER_TTL', '1800'))  # 天气缓存有效期（秒），0 关闭缓存
+    weather_stale = float(os.getenv('WEATHER_STALE', '7200'))  # 过期后还能先用旧数据、后台刷新的时长（秒）
+    push_timeout = float(os.getenv('PUSH_TIMEOUT', '10'))  # 单次推送请求的超时（秒）
+    push_retries = int(os.getenv('PUSH_RETRIES', '3'))  # 每次运行内每条消息最多尝试几次，之后留到下次运行
+    push_rate = float(os.getenv('PUSH_RATE', '1'))  # 每个推送 key 每秒最多推送几条
+    push_max_age = float(os.getenv('PUSH_MAX_AGE', '86400'))  # 发件箱中的消息多少秒后仍未送达就放弃
+    push_times = os.getenv('PUSH_TIMES', '08:00,20:00')  # 常驻模式的推送时间
+    push_timezone = os.getenv('PUSH_TIMEZONE', 'Asia/Shanghai')  # 推送时间所在的时区
+    prefetch_lead = float(os.getenv('PREFETCH_LEAD', '300'))  # 常驻模式提前多少秒开始抓取
+    refresh_interval = float(os.getenv('REFRESH_INTERVAL', '1800'))  # 常驻模式空闲时刷新新闻源的间隔（秒），0 关闭
+    profile_dir = os.getenv('PROFILE_DIR', 'profile')  # --profile 的结果目录
+
+    if args.profile:
+        # 剖析器同一时刻只能跟踪一个步骤，并发执行的步骤会被跳过
+        fetch_mode = 'sequential'
+        push_concurrency = 1
+
+    # 发件箱：渲染好的消息先落盘再推送，未送达的下次运行重发
+    outbox = Outbox(os.path.join(state_dir, 'outbox.db'), retries=push_retries, rate=push_rate,
+                    max_age=push_max_age)
+    if subscribers_file:
+        subscribers = load_subscribers(subscribers_file, default_city=city)
+    elif push_channels:
+        subscribers = [{'name': channel_type, 'push_type': channel_type, 'push_key': channel_key,
+                        'city': city, 'sections': None} for channel_type, channel_key in parse_channels(push_channels)]
+    elif push_key:
+        subscribers = [{'name': '默认', 'push_type': push_type, 'push_key': push_key,
+                        'city': city, 'sections': None}]
+    else:
         print("错误: 未设置 PUSH_KEY 环境变量")
         return
+    if not subscribers:
+        print("错误: 没有可推送的订阅者")
+        return
+    if args.retry_outbox:
+        # 发件箱里没有推送 key，按当前配置找回
+        sent, pending = deliver_outbox(outbox, subscribers, concurrency=push_concurrency, timeout=push_timeout)
+        print(f"发件箱: 重发成功 {sent} 条，仍待发 {pending} 条")
+        outbox.close()
+        return
 
-    # 获取新闻和天气（优化数量以避免内容过长）
-    fetcher = NewsFetcher()
-    fetcher.fetch_weather(city=city)
-    fetcher.fetch_hot_news(limit=6)
-    fetcher.fetch_toutiao_hot(limit=6)
-    fetcher.fetch_douyin_hot(limit=6)
-    fetcher.fetch_tech_news(limit=5)
-    fetcher.fetch_ai_news(limit=3)  # 在tech_news之后，可以从中筛选AI内容
-
-    # 格式化消息
-    current_hour = datetime.now().hour
-    if current_hour < 12:
-        title = "早间新闻"
-    else:
-        title = "晚间新闻"
-
-    message = fetcher.format_message(title)
-
-    # 推送消息
-    pusher = MessagePusher(push_type, push_key)
-    success = pusher.push(title, message)
+    # 需要天气的城市（按城市去重）
+    cities = list(dict.fromkeys(
+        sub['city'] for sub in subscribers if sub['sections'] is None or 'weather' in sub['sections']))
+    # 只抓取有人订阅的板块
+    sections = required_sections(subscribers, global_hot=bool(global_hot_limit))
+
+    if message_budget and message_budget != 'auto':
+        message_budget = int(message_budget)
+    # 开启预算时多抓一些，由渲染器挑选；否则手动控制数量以避免内容过长
+    limits = BUDGET_LIMITS if message_budget else DEFAULT_LIMITS
+
+    # 跨期复用的连接池、缓存和熔断状态（常驻模式下一直保持预热）
+    feed_cache = FeedCache(os.path.join(state_dir, 'feed_cache.json'))
+    breaker = CircuitBreaker(os.path.join(state_dir, 'circuit_breaker.json'),
+                             threshold=breaker_threshold, cooldown=breaker_cooldown)
+    latency = LatencyTracker(os.path.join(state_dir, 'latency.json'),
+                             floor=timeout_floor, ceiling=timeout_ceiling) if timeout_ceiling else None
+    http = HttpClient(max_bytes=max_bytes, feed_cache=feed_cache, breaker=breaker, latency=latency)
+    weather_cache = WeatherCache(os.path.join(state_dir, 'weather_cache.json'),
+                                 ttl=weather_ttl, stale=weather_stale) if weather_ttl else None
+    classifier = TopicClassifier(load_topics(topics_file)) if topics_file else None
+    registry = load_registry(sources_file) if sources_file else None
+
+    def fetch(metrics=None):
+        """获取新闻和天气"""
+        fetcher = NewsFetcher(http=http, metrics=metrics, classifier=classifier, sources=registry,
+                              weather_cache=weather_cache)
+        if fetch_mode.lower() == 'sequential':
+            # 每个城市在临时实例上获取，和 fetch_all 一样：某个城市失败时不会留下上一个城市的天气
+            for c in cities:
+                weather = fetcher._run_stage('weather', 'fetch_weather', city=c)
+                if weather is not None:
+                    fetcher.weathers[c] = weather
+            if cities:
+                fetcher.weather = fetcher.weathers.get(cities[0])
+            # ai_news 在 tech_news 之后，可以从中筛选AI内容
+            for attr, method in (*FETCH_STAGES.items(), ('ai_news', 'fetch_ai_news')):
+                if attr in sections:
+                    getattr(fetcher, method)(limit=limits[attr])
+        else:
+            # 截止时间不超过剩余的时间预算
+            remaining = http.remaining()
+            deadline = fetch_deadline if remaining is None else max(0, min(fetch_deadline, remaining))
+            fetcher.fetch_all(cities=cities, limits=limits, deadline=deadline,
+                              hedge_delay=float(hedge_delay) if hedge_delay else None, sections=sections)
+        return fetcher
+
+    def save_state():
+        print(feed_cache.report())
+        print(http.report())
+        print(breaker.report())
+        feed_cache.save()
+        breaker.save()
+        if latency:
+            latency.save()
+            print(latency.report())
+        if weather_cache:
+            weather_cache.save()
+            print(weather_cache.report())
+
+    def run_edition(title, not_before=None):
+        """完整的一期：抓取、去重、记录、渲染、推送"""
+        profiler = None
+        if args.profile:
+            from profiling import Profiler
+            profiler = Profiler(profile_dir)
+        metrics = RunMetrics(profiler=profiler)
+        # 本期的新闻源请求（含备用方案）共用一个时间预算，推送不受限制
+        http.set_budget(run_budget)
+        http.reset_shared()
+        fetcher = fetch(metrics)
+        remaining = http.remaining()
+        http.set_budget(None)
+        if remaining is not None and remaining <= 0:
+            print(f"抓取用完了 {run_budget:.0f} 秒的时间预算，未完成的新闻源本次跳过")
+
+        if dedup:
+            merge_duplicate_stories(fetcher)
+        fetcher.tag_topics()
+
+        store = ItemStore(os.path.join(state_dir, 'items.db'))
+        store.record(fetcher)
+
+        # 内容指纹按过滤前的完整榜单计算
+        snapshot = store.snapshot(fetcher)
+        changed = store.count_changed(snapshot) if min_changed else None
+        if changed is not None and changed < min_changed:
+            print(f"和上次推送相比只有 {changed} 条新新闻（少于 {min_changed} 条），本次不渲染、不推送")
+            deliver_outbox(outbox, subscribers, http=http, metrics=metrics, concurrency=push_concurrency,
+                           timeout=push_timeout)
+        elif incremental and store.filter_incremental(fetcher) == 0:
+            print("没有新内容，本次不推送")
+            deliver_outbox(outbox, subscribers, http=http, metrics=metrics, concurrency=push_concurrency,
+                           timeout=push_timeout)
+        else:
+            if global_hot_limit:
+                fetcher.build_global_hot(limit=global_hot_limit)
+
+            # 渲染并推送给每个订阅者
+            results = push_to_subscribers(fetcher, subscribers, title, http=http, concurrency=push_concurrency,
+                                          budget=message_budget or None, metrics=metrics, not_before=not_before,
+                                          outbox=outbox, timeout=push_timeout)
+
+            if all(results):
+                print("✅ 新闻推送成功!")
+            else:
+                print("❌ 新闻推送失败!")
+            if any(results):
+                store.mark_pushed(fetcher)
+                store.save_snapshot(snapshot)
+
+        store.prune(retention_days)
+        store.close()
+        outbox.prune()
+
+        save_state()
+        print(metrics.report())
+        if metrics_file:
+            metrics.save(metrics_file)
+        if prometheus_file:
+            metrics.save_prometheus(prometheus_file)
+        if profiler:
+            profiler.save()
+
+    if not args.daemon:
+        run_edition(edition_title(datetime.now().hour))
+        outbox.close()
+        return
 
-    if success:
-        print("✅ 新闻推送成功!")
-    else:
-        print("❌ 新闻推送失败!")
+    def refresh():
+        """空闲时刷新一遍新闻源：RSS 走条件请求更新缓存，同时保持连接和 DNS 缓存"""
+        print("后台刷新新闻源...")
+        http.reset_shared()
+        fetch()
+        # 顺便重发上一期没送达的消息
+        if outbox.pending_count():
+            deliver_outbox(outbox, subscribers, http=http, concurrency=push_concurrency, timeout=push_timeout)
+        save_state()
+
+    scheduler = Scheduler(parse_times(push_times),
+                          run_edition=lambda slot: run_edition(edition_title(slot.hour), not_before=slot.timestamp()),
+                          refresh=refresh, lead=prefetch_lead, refresh_interval=refresh_interval,
+                          tz=get_timezone(push_timezone))
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        save_state()
+        print("已退出常驻模式")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+新闻条目
+所有抓取方法统一产出 NewsItem：来源、排名、标题、链接、数值热度、时间戳。
+热度字符串（"1234万热度"、"4962123"、整数……）在抓取时只解析一次，
+之后按来源归一化，用来把知乎/百度/头条/抖音排进同一个“全网热榜”
+"""
+
+import math
+import re
+import time
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from html import escape
+
+from normalize import normalize_fields
+
+
+# 来源 id -> 显示名称；新闻源注册表里的 label 优先，这里只给没有带来源名称的条目兜底
+SOURCE_LABELS = {
+    'zhihu': '知乎',
+    'baidu': '百度',
+    'toutiao': '头条',
+    'douyin': '抖音',
+    '36kr': '36氪',
+    'sspai': '少数派',
+    'ifanr': '爱范儿',
+    'jiqizhixin': '机器之心',
+}
+
+HEAT_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*(万|亿)?')
+HEAT_UNITS = {'万': 10000, '亿': 100000000}
+
+# 全网热榜：被多个来源同时报道的新闻，每多一个来源加的分
+CROSS_SOURCE_BONUS = 0.25
+
+
+def parse_heat(value):
+    """热度 → 数字；"1234万热度" → 12340000，解析不了返回 None"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = HEAT_PATTERN.search(str(value).replace(',', ''))
+    if not match:
+        return None
+    return float(match.group(1)) * HEAT_UNITS.get(match.group(2), 1)
+
+
+def parse_time(value):
+    """RSS/Atom 的发布时间（RFC 822 或 ISO 8601）→ 时间戳，解析不了返回 None"""
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        pass
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+class NewsItem:
+    """一条新闻；字段固定，不再用松散的 dict"""
+
+    FIELDS = ('source', 'label', 'section', 'rank', 'title', 'url', 'summary', 'heat', 'heat_text', 'score',
+              'sources', 'tags', 'published_at', 'fetched_at')
+    __slots__ = FIELDS + ('render_key', 'html_title', 'html_url')
+
+    def __init__(self, source, section, rank, title, url, summary='', heat=None, heat_text='', score=None,
+                 sources=(), tags=(), published_at=None, fetched_at=None, label=None):
+        self.source = source
+        self.label = label  # 新闻源注册表中的来源名称
+        self.section = section
+        self.rank = rank  # 在来源榜单中的名次，从 1 开始
+        self.title = title
+        self.url = url
+        self.summary = summary
+        self.heat = heat  # 数值热度，没有热度时为 None
+        self.heat_text = heat_text  # 原始热度文字
+        self.score = score  # 按来源归一化后的热度（0~1），构建全网热榜时计算
+        self.sources = sources  # 跨来源去重后所有报道来源的名称
+        self.tags = tags
+        self.published_at = published_at
+        self.fetched_at = fetched_at
+        # 渲染用到的字段，作为片段缓存的键；这些字段创建后不再修改（改动用 replace），键在创建时构建一次
+        self.render_key = (title, url, heat, heat_text, summary, sources, label, section, tags)
+        # HTML 版插入的标题和链接（转义后），同样只算一次，每次渲染直接取
+        self.html_title = escape(title)
+        self.html_url = escape(url)
+
+    def replace(self, **changes):
+        """复制一份并修改部分字段"""
+        fields = {name: getattr(self, name) for name in self.FIELDS}
+        fields.update(changes)
+        return NewsItem(**fields)
+
+    @property
+    def source_label(self):
+        return self.label or SOURCE_LABELS.get(self.source, self.source)
+
+    def __repr__(self):
+        return f"NewsItem({self.source!r}, #{self.rank}, {self.title!r}, heat={self.heat})"
+
+
+def make_item(source, section, rank, title, url, hot=None, summary=None, published=None, label=None):
+    """抓取方法统一用它生成条目：规范化标题/链接/摘要，解析热度和发布时间；label 为来源名称"""
+    title, url, summary = normalize_fields(title, url, summary)
+    return NewsItem(
+        source, section, rank, title, url,
+        label=label,
+        summary=summary or '',
+        heat=parse_heat(hot),
+        heat_text='' if hot is None else str(hot),
+        published_at=parse_time(published),
+        fetched_at=time.time(),
+    )
+
+
+def score_by_source(items):
+    """按来源归一化热度：热度除以该来源榜首的热度；没有热度的条目按名次给分"""
+    by_source = {}
+    for item in items:
+        by_source.setdefault(item.source, []).append(item)
+
+    scored = []
+    for group in by_source.values():
+        heats = [item.heat for item in group if item.heat]
+        top = max(heats) if heats else None
+        for item in group:
+            if top and item.heat:
+                score = item.heat / top
+            else:
+                score = 1.0 / (1 + math.log(item.rank or 1)) * (0.5 if top else 1.0)
+            scored.append(item.replace(score=score))
+    return scored
+
+
+def merge_rankings(*sections, limit=10):
+    """把多个热榜按归一化热度合成一个榜单（多来源报道的新闻额外加分）"""
+    scored = score_by_source([item for items in sections for item in items])
+    for item in scored:
+        item.score += CROSS_SOURCE_BONUS * max(0, len(item.sources) - 1)
+    scored.sort(key=lambda item: (-item.score, item.rank))
+    return scored[:limit]
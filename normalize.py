@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抓取时的内容规范化
+每条新闻抓到时只处理一次：去掉 HTML 标签、解码实体、合并空白、按显示宽度截断摘要、规范化链接；
+结果按 URL 缓存，多次渲染、多个订阅者、多个抓取实例都直接复用
+"""
+
+import html
+import re
+import threading
+import unicodedata
+from bisect import bisect_right
+from itertools import accumulate
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+# 摘要在抓取时保留的最大显示宽度（汉字算 2，字母数字算 1），渲染时再按版式截短
+SUMMARY_WIDTH = 200
+# 超长全文只取前面这么多字符再清理（摘要用不到后面的内容）
+MAX_RAW_CHARS = 4000
+ELLIPSIS = '...'
+
+# 预编译的清理规则
+BLOCK_PATTERN = re.compile(r'<(script|style)\b[^>]*>.*?</\1\s*>', re.S | re.I)
+TAG_PATTERN = re.compile(r'<[^>]*>')
+DANGLING_TAG = re.compile(r'<[^>]*$')  # 截断后残留的半个标签
+WHITESPACE = re.compile(r'\s+')
+# 不影响内容的跟踪参数
+TRACKING_PARAMS = re.compile(r'^(utm_\w+|spm|from|source|share_\w+|timestamp)$')
+
+
+def clean_text(text):
+    """去掉 HTML 标签、解码实体、合并空白"""
+    if not text:
+        return ''
+    text = str(text)
+    if len(text) > MAX_RAW_CHARS:
+        text = DANGLING_TAG.sub('', text[:MAX_RAW_CHARS])
+    if '<' in text:
+        text = TAG_PATTERN.sub('', BLOCK_PATTERN.sub('', text))
+    if '&' in text:
+        text = html.unescape(text)
+    return WHITESPACE.sub(' ', text).strip()
+
+
+def char_width(ch):
+    return 2 if unicodedata.east_asian_width(ch) in ('W', 'F') else 1
+
+
+class CharWidths(dict):
+    """字符 -> 显示宽度，用到时才查 unicodedata；按下标取值走 C 实现，逐字计算宽度时不必调用 Python 函数"""
+
+    def __missing__(self, ch):
+        width = self[ch] = char_width(ch)
+        return width
+
+
+_char_widths = CharWidths()
+
+
+def truncate_display(text, width):
+    """按显示宽度截断，超出时加省略号"""
+    if len(text) * 2 <= width:
+        return text
+    if text.isascii():
+        return text if len(text) <= width else text[:width].rstrip() + ELLIPSIS
+    # 每个字符至少占 1，最多前 width 个字符放得下：只算这部分的累计宽度，二分找截断位置
+    used = list(accumulate(map(_char_widths.__getitem__, text[:width + 1])))
+    if len(text) <= width and used[-1] <= width:
+        return text
+    return text[:bisect_right(used, width)].rstrip() + ELLIPSIS
+
+
+def normalize_url(url):
+    """规范化 URL：小写协议和主机名、去掉锚点和跟踪参数、参数排序、去掉末尾斜杠"""
+    if not url:
+        return ''
+    url = url.strip()
+    if url.startswith('//'):
+        url = 'https:' + url
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not TRACKING_PARAMS.match(k))
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ''))
+
+
+class Normalizer:
+    """按 URL 缓存规范化结果；线程安全"""
+
+    def __init__(self, max_items=2048, summary_width=SUMMARY_WIDTH):
+        self.max_items = max_items
+        self.summary_width = summary_width
+        self.lock = threading.Lock()
+        self.cache = {}  # 原始 URL -> (原始标题, 原始摘要, 规范化结果)
+        self.hits = 0
+        self.misses = 0
+
+    def fields(self, title, url, summary=None):
+        """标题、链接、摘要的规范化结果 (title, url, summary)"""
+        url = url or ''
+        key = url or 'title:' + (title or '')
+        with self.lock:
+            cached = self.cache.get(key)
+            if cached and cached[0] == title and cached[1] == summary:
+                self.hits += 1
+                return cached[2]
+
+        fields = (
+            clean_text(title),
+            normalize_url(url),
+            truncate_display(clean_text(summary), self.summary_width) if summary else summary,
+        )
+
+        with self.lock:
+            self.misses += 1
+            if len(self.cache) >= self.max_items:
+                # 简单起见整体清空，一次运行的条目数远小于上限
+                self.cache.clear()
+            self.cache[key] = (title, summary, fields)
+        return fields
+
+
+_default_normalizer = Normalizer()
+
+
+def normalize_fields(title, url, summary=None):
+    """用进程内共享的规范化器处理一条新闻的标题、链接和摘要"""
+    return _default_normalizer.fields(title, url, summary)
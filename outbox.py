@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+推送发件箱（SQLite）
+渲染好的消息先写入发件箱再推送：失败时按指数退避重试，本次运行重试不成功的消息留在发件箱，
+下次运行直接重发，不需要重新抓取和渲染。消息以内容哈希作为幂等键，同一条消息不会重复推送；
+每个推送 key 一个令牌桶，避免触发渠道的频率限制。
+发件箱随状态目录一起被缓存，所以不保存推送 key 本身，只保存渠道标识（key 的哈希），推送时再按当前配置找回 key
+"""
+
+import hashlib
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+PENDING = 'pending'
+SENT = 'sent'
+DEAD = 'dead'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id TEXT PRIMARY KEY,            -- 幂等键：渠道 + 标题 + 内容的哈希
+    push_type TEXT NOT NULL,
+    channel TEXT NOT NULL,          -- 渠道标识：推送类型 + 推送 key 的哈希，不保存 key 本身
+    subscriber TEXT,
+    format TEXT,                    -- 消息格式（html / markdown / text），Webhook 随消息一起发送
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    status TEXT NOT NULL,           -- pending / sent / dead（超过重试次数或过期）
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    last_error TEXT,
+    sent_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_status ON messages(status, next_attempt);
+"""
+
+
+def _digest(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def channel_id(push_type, push_key):
+    """渠道标识：同一个推送 key 总是得到同一个标识，从标识推不出 key"""
+    return _digest('channel', push_type.lower(), push_key)[:24]
+
+
+def message_id(push_type, push_key, title, content):
+    return _digest(channel_id(push_type, push_key), title, content)[:32]
+
+
+class TokenBucket:
+    """令牌桶：平均每秒 rate 次，最多连续 burst 次"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """取一个令牌，不够时等待"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Outbox:
+    """发件箱；写入在主线程，推送线程通过锁共用同一个连接更新状态
+
+    retries 为每次运行内的尝试次数，max_attempts 为累计尝试上限，max_age 秒后仍未送达的消息不再推送
+    （默认 24 小时，比早晚两次运行的间隔长，上一期失败的消息下一期还能重发）
+    """
+
+    def __init__(self, path, retries=3, max_attempts=8, backoff=2.0, max_backoff=60.0,
+                 rate=1.0, burst=3, max_age=24 * 3600):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.retries = retries
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.rate = rate
+        self.burst = burst
+        self.max_age = max_age
+        self.buckets = {}
+
+    def close(self):
+        self.conn.close()
+
+    def enqueue(self, push_type, push_key, title, content, subscriber=None, fmt=None, now=None):
+        """写入一条待推送的消息，返回幂等键；已经送达过的相同消息不会再次推送；fmt 为消息渲染时用的格式"""
+        now = now or time.time()
+        key = message_id(push_type, push_key, title, content)
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO messages (id, push_type, channel, subscriber, format, title, content, created_at, "
+                "status, next_attempt) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                # 之前放弃的相同消息重新开始计数
+                "ON CONFLICT(id) DO UPDATE SET status = excluded.status, attempts = 0, created_at = excluded.created_at, "
+                "next_attempt = excluded.next_attempt WHERE status = ?",
+                (key, push_type, channel_id(push_type, push_key), subscriber, fmt, title, content, now, PENDING, now,
+                 DEAD))
+        return key
+
+    def statuses(self, ids):
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT id, status FROM messages WHERE id IN ({','.join('?' * len(ids))})", list(ids)).fetchall()
+        return {row['id']: row['status'] for row in rows}
+
+    def pending_count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM messages WHERE status = ?", (PENDING,)).fetchone()[0]
+
+    def deliver(self, send, concurrency=4, now=None):
+        """推送所有到期的待发消息（包括之前运行留下的），返回 (送达数, 仍待发数)
+
+        send(message) 推送一条消息（message['channel'] 为渠道标识），失败时抛出异常；
+        异常的 retry 属性为 False 时不再重试。同一渠道、同一推送 key 的消息由一个线程按写入顺序发送，前一条没送达时后面的留到下次；
+        不同渠道之间并发推送，总耗时取决于最慢的渠道
+        """
+        now = now or time.time()
+        with self.lock, self.conn:
+            expired = self.conn.execute(
+                "UPDATE messages SET status = ?, last_error = '过期未送达' WHERE status = ? AND created_at < ?",
+                (DEAD, PENDING, now - self.max_age)).rowcount
+            rows = self.conn.execute(
+                "SELECT * FROM messages WHERE status = ? AND next_attempt <= ? ORDER BY rowid",
+                (PENDING, now)).fetchall()
+        if expired:
+            print(f"发件箱: {expired} 条消息超过 {self.max_age / 3600:.0f} 小时未送达，已放弃")
+
+        groups = {}
+        for row in rows:
+            groups.setdefault(row['channel'], []).append(dict(row))
+        if not groups:
+            return 0, self.pending_count()
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(groups)), thread_name_prefix='push') as executor:
+            sent = sum(executor.map(lambda messages: self._deliver_group(send, messages), groups.values()))
+        pending = self.pending_count()
+        if pending:
+            print(f"发件箱: {pending} 条消息未送达，下次运行重发")
+        return sent, pending
+
+    def _bucket(self, channel):
+        with self.lock:
+            bucket = self.buckets.get(channel)
+            if bucket is None:
+                bucket = self.buckets[channel] = TokenBucket(self.rate, self.burst)
+            return bucket
+
+    def _delay(self, attempts):
+        """第 attempts 次失败后的等待时间：指数退避 + 随机抖动"""
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _deliver_group(self, send, messages):
+        """按顺序推送同一个 key 的消息，返回送达条数"""
+        bucket = self._bucket(messages[0]['channel'])
+        sent = 0
+        for message in messages:
+            if not self._deliver_one(send, bucket, message):
+                break
+            sent += 1
+        return sent
+
+    def _deliver_one(self, send, bucket, message):
+        for attempt in range(1, self.retries + 1):
+            bucket.acquire()
+            try:
+                send(message)
+            except Exception as e:
+                message['attempts'] += 1
+                retry = getattr(e, 'retry', True) and message['attempts'] < self.max_attempts
+                delay = self._delay(message['attempts'])
+                if not retry:
+                    self._update(message['id'], DEAD, message['attempts'], str(e))
+                    print(f"{message['subscriber']} 推送失败，不再重试: {str(e)}")
+                    return False
+                if attempt == self.retries:
+                    self._update(message['id'], PENDING, message['attempts'], str(e), next_attempt=time.time() + delay)
+                    print(f"{message['subscriber']} 推送失败（第 {message['attempts']} 次）: {str(e)}，留在发件箱")
+                    return False
+                print(f"{message['subscriber']} 推送失败（第 {message['attempts']} 次）: {str(e)}，{delay:.1f} 秒后重试")
+                time.sleep(delay)
+            else:
+                self._update(message['id'], SENT, message['attempts'] + 1, None, sent_at=time.time())
+                return True
+        return False
+
+    def _update(self, key, status, attempts, error, next_attempt=None, sent_at=None):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE messages SET status = ?, attempts = ?, last_error = ?, "
+                "next_attempt = COALESCE(?, next_attempt), sent_at = COALESCE(?, sent_at) WHERE id = ?",
+                (status, attempts, error, next_attempt, sent_at, key))
+
+    def prune(self, days=7, now=None):
+        """删除早于 days 天的已送达/已放弃消息"""
+        cutoff = (now or time.time()) - days * 86400
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM messages WHERE status != ? AND created_at < ?", (PENDING, cutoff))
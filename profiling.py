@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按步骤采集 CPU 和内存（--profile）
+挂在运行指标的步骤上：每个 fetch_*、format_message、push 步骤在 cProfile 下执行，
+前后各取一次 tracemalloc 快照，记录该步骤的内存峰值和分配最多的代码行。
+运行结束后把热点函数报告、内存报告、汇总 JSON 和原始 .prof 文件写入目录，供 workflow 上传
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+
+
+# tracemalloc 每次分配只保留分配所在的代码行，快照更小更快
+TRACE_FRAMES = 1
+# 剖析本身的分配不计入（按汇总后的代码行排除，对全部分配逐条过滤太慢）
+IGNORED = (tracemalloc.__file__, __file__)
+
+
+class StageProfile:
+    """一个步骤（可能执行多次）的累计结果"""
+
+    __slots__ = ('name', 'calls', 'seconds', 'peak', 'allocated', 'stats', 'sites')
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.0
+        self.peak = 0  # 步骤执行期间比开始时多占用的最大内存（字节）
+        self.allocated = 0  # 步骤结束时仍未释放的新增内存（字节）
+        self.stats = None
+        self.sites = {}  # 代码行 -> [新增字节数, 新增块数]
+
+    def to_dict(self, top):
+        sites = sorted(self.sites.items(), key=lambda item: item[1][0], reverse=True)[:top]
+        return {
+            'calls': self.calls,
+            'seconds': round(self.seconds, 4),
+            'peak_bytes': self.peak,
+            'allocated_bytes': self.allocated,
+            'top_allocations': [{'site': site, 'bytes': size, 'blocks': count} for site, (size, count) in sites],
+        }
+
+
+class Profiler:
+    """一次运行的分步骤性能剖析
+
+    cProfile 只统计调用它的线程，tracemalloc 统计整个进程，所以同一时刻只剖析一个步骤：
+    另一个线程里同时开始的步骤照常执行、不计入（剖析时抓取改为顺序执行，避免这种情况）
+    """
+
+    def __init__(self, directory, top=30):
+        self.directory = directory
+        self.top = top
+        self.stages = {}
+        self.lock = threading.Lock()
+        self.skipped = 0  # 因为其他步骤正在剖析而跳过的步骤数
+        self.peak = 0  # 各步骤执行期间进程内存（tracemalloc 跟踪到的部分）的最大值
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+
+    def stage(self, name):
+        """返回包住一个步骤的上下文管理器"""
+        return _StageContext(self, name)
+
+    def _stage(self, name):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = StageProfile(name)
+        return stage
+
+    def report(self):
+        """内存报告：按耗时列出每个步骤的内存峰值、留存和分配最多的代码行"""
+        lines = []
+        for stage in sorted(self.stages.values(), key=lambda s: s.seconds, reverse=True):
+            lines.append(f"== {stage.name}: {stage.calls} 次, {stage.seconds:.3f} 秒, "
+                         f"内存峰值 +{stage.peak / 1024:.1f} KB, 留存 +{stage.allocated / 1024:.1f} KB")
+            for site, (size, count) in sorted(stage.sites.items(), key=lambda item: item[1][0],
+                                              reverse=True)[:10]:
+                lines.append(f"   {size / 1024:9.1f} KB {count:7d} 块  {site}")
+        return '\n'.join(lines) + '\n'
+
+    def hot_functions(self, stats, sort='cumulative'):
+        out = io.StringIO()
+        stats.stream = out
+        stats.sort_stats(sort).print_stats(self.top)
+        return out.getvalue()
+
+    def save(self):
+        """写入剖析结果，返回目录"""
+        os.makedirs(self.directory, exist_ok=True)
+        merged = pstats.Stats()
+        cpu = []
+        for stage in sorted(self.stages.values(), key=lambda s: s.seconds, reverse=True):
+            if stage.stats is None:
+                continue
+            stage.stats.dump_stats(os.path.join(self.directory, f"{_filename(stage.name)}.prof"))
+            cpu.append(f"==================== {stage.name} ====================\n"
+                       + self.hot_functions(stage.stats))
+            merged.add(stage.stats)
+        if merged.stats:
+            merged.dump_stats(os.path.join(self.directory, 'all.prof'))
+            # 全部步骤合并后按自身耗时排序，最能看出 CPU 花在哪里
+            cpu.insert(0, "==================== 全部步骤（按自身耗时） ====================\n"
+                       + self.hot_functions(merged, sort='tottime'))
+
+        with open(os.path.join(self.directory, 'cpu.txt'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(cpu))
+        with open(os.path.join(self.directory, 'memory.txt'), 'w', encoding='utf-8') as f:
+            f.write(self.report())
+        with open(os.path.join(self.directory, 'profile.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'peak_bytes': self.peak,
+                'skipped': self.skipped,
+                'stages': {name: stage.to_dict(self.top) for name, stage in self.stages.items()},
+            }, f, ensure_ascii=False, indent=2)
+        print(f"性能剖析: {len(self.stages)} 个步骤，结果已写入 {self.directory}")
+        return self.directory
+
+
+def _filename(name):
+    return re.sub(r'[^0-9A-Za-z_.-]+', '_', name)
+
+
+def _site(frame):
+    return f"{frame.filename}:{frame.lineno}"
+
+
+class _StageContext:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.active = False
+
+    def __enter__(self):
+        # 其他线程正在剖析时不等待，本步骤不计入
+        self.active = self.profiler.lock.acquire(blocking=False)
+        if not self.active:
+            self.profiler.skipped += 1
+            return self
+        # 先取快照再记基线，快照本身占用的内存不算进步骤
+        self.before = tracemalloc.take_snapshot()
+        self.base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        self.profile = cProfile.Profile()
+        self.start = time.perf_counter()
+        self.profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self.active:
+            return False
+        try:
+            self.profile.disable()
+            seconds = time.perf_counter() - self.start
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+
+            self.profiler.peak = max(self.profiler.peak, peak)
+            stage = self.profiler._stage(self.name)
+            stage.calls += 1
+            stage.seconds += seconds
+            stage.peak = max(stage.peak, peak - self.base)
+            stage.allocated += current - self.base
+            if stage.stats is None:
+                stage.stats = pstats.Stats(self.profile)
+            else:
+                stage.stats.add(self.profile)
+            # 按分配发生的代码行（调用栈最内层）汇总新增的内存
+            for diff in after.compare_to(self.before, 'lineno'):
+                if diff.size_diff <= 0 or diff.traceback[0].filename in IGNORED:
+                    continue
+                site = stage.sites.setdefault(_site(diff.traceback[0]), [0, 0])
+                site[0] += diff.size_diff
+                site[1] += diff.count_diff
+        finally:
+            self.profiler.lock.release()
+        return False
@@ -0,0 +1,649 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+消息渲染
+静态的页头/CSS 只构建一次；每个板块由独立的渲染函数写入列表缓冲区，
+板块片段按内容缓存，同一批新闻渲染多个版本（如每个订阅者一份）时直接复用。
+这里是 HTML 版（PushPlus），Markdown / 纯文本版见 text_renderer.py
+"""
+
+import functools
+import re
+import threading
+from datetime import datetime
+from html import escape as html_escape
+
+from normalize import truncate_display
+
+
+WEEKDAYS = ("周一", "周二", "周三", "周四", "周五", "周六", "周日")
+
+# 页头（含全部 CSS），模块加载时构建一次
+HEAD = """
+<!DOCTYPE html>
+<html>
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<style>
+    * {
+        margin: 0;
+        padding: 0;
+        box-sizing: border-box;
+    }
+    body {
+        background: #f5f5f7;
+        color: #1d1d1f;
+        font-family: -apple-system, BlinkMacSystemFont, "SF Pro Display", "Segoe UI", "PingFang SC", sans-serif;
+        padding: 0;
+        margin: 0;
+        line-height: 1.6;
+    }
+    .container {
+        max-width: 100%;
+        background: #f5f5f7;
+    }
+    .header {
+        background: #fff;
+        padding: 24px 16px;
+        text-align: center;
+        border-bottom: 1px solid #e5e5e7;
+    }
+    .header h1 {
+        color: #1d1d1f;
+        font-size: 22px;
+        font-weight: 600;
+        margin: 0;
+    }
+    .time-bar {
+        background: #fff;
+        padding: 12px 16px;
+        font-size: 13px;
+        color: #86868b;
+        text-align: center;
+        border-bottom: 1px solid #e5e5e7;
+    }
+    .section {
+        margin-top: 12px;
+    }
+    .section-header {
+        background: #fff;
+        color: #1d1d1f;
+        padding: 12px 16px;
+        font-size: 17px;
+        font-weight: 600;
+        border-bottom: 1px solid #e5e5e7;
+    }
+    .news-card {
+        background: #fff;
+        border-bottom: 1px solid #e5e5e7;
+        padding: 16px;
+    }
+    .news-card:active {
+        background: #f5f5f7;
+    }
+    .rank {
+        display: inline-block;
+        background: #f5f5f7;
+        color: #1d1d1f;
+        font-weight: 600;
+        font-size: 12px;
+        padding: 4px 10px;
+        border-radius: 12px;
+        margin-bottom: 8px;
+        min-width: 36px;
+        text-align: center;
+    }
+    .rank.top {
+        background: #ff3b30;
+        color: #fff;
+    }
+    .news-title {
+        color: #1d1d1f;
+        font-size: 15px;
+        line-height: 1.5;
+        text-decoration: none;
+        display: block;
+        margin-bottom: 8px;
+        font-weight: 400;
+    }
+    .hot-tag {
+        display: inline-block;
+        background: #ff3b30;
+        color: #fff;
+        font-size: 11px;
+        padding: 2px 8px;
+        border-radius: 10px;
+        font-weight: 500;
+        margin-top: 4px;
+    }
+    .topic-tag {
+        display: inline-block;
+        background: #f5f5f7;
+        color: #6e6e73;
+        font-size: 11px;
+        padding: 2px 8px;
+        border-radius: 10px;
+        margin: 4px 0 0 4px;
+    }
+    .tech-card {
+        background: #fff;
+        border-left: 3px solid #007aff;
+        padding: 16px;
+        margin-bottom: 1px;
+    }
+    .tech-card:active {
+        background: #f5f5f7;
+    }
+    .tech-number {
+        color: #007aff;
+        font-weight: 600;
+        font-size: 13px;
+        margin-bottom: 8px;
+    }
+    .tech-title {
+        color: #1d1d1f;
+        font-size: 15px;
+        font-weight: 500;
+        line-height: 1.5;
+        margin-bottom: 8px;
+    }
+    .tech-title a {
+        color: #1d1d1f;
+        text-decoration: none;
+    }
+    .tech-summary {
+        color: #86868b;
+        font-size: 13px;
+        line-height: 1.5;
+        margin-bottom: 8px;
+    }
+    .read-more {
+        color: #007aff;
+        font-size: 13px;
+        font-weight: 500;
+        text-decoration: none;
+    }
+    .weather-card {
+        background: linear-gradient(135deg, #007aff 0%, #5ac8fa 100%);
+        padding: 20px 16px;
+        color: #fff;
+        margin-top: 12px;
+    }
+    .weather-title {
+        font-size: 17px;
+        font-weight: 600;
+        margin-bottom: 16px;
+        text-align: center;
+    }
+    .weather-grid {
+        display: grid;
+        grid-template-columns: 1fr 1fr;
+        gap: 12px;
+    }
+    .weather-item {
+        background: rgba(255, 255, 255, 0.15);
+        padding: 16px;
+        border-radius: 12px;
+        text-align: center;
+        backdrop-filter: blur(10px);
+    }
+    .weather-day {
+        font-size: 13px;
+        opacity: 0.9;
+        margin-bottom: 8px;
+    }
+    .weather-temp {
+        font-size: 32px;
+        font-weight: 600;
+        margin: 8px 0;
+    }
+    .weather-desc {
+        font-size: 14px;
+        opacity: 0.9;
+    }
+    .ai-card {
+        background: #fff;
+        border-left: 3px solid #ff9500;
+        padding: 16px;
+        margin-bottom: 1px;
+    }
+    .ai-card:active {
+        background: #f5f5f7;
+    }
+    .footer {
+        background: #fff;
+        border-top: 1px solid #e5e5e7;
+        padding: 20px 16px;
+        text-align: center;
+        color: #86868b;
+        font-size: 12px;
+        margin-top: 12px;
+    }
+    .footer-text {
+        color: #86868b;
+        margin: 4px 0;
+    }
+</style>
+</head>
+<body>
+<div class="container">
+    <div class="header">
+"""
+
+FOOTER = """
+    <div class="footer">
+        <div class="footer-text">每日 08:00 / 20:00 自动推送</div>
+    </div>
+</div>
+</body>
+</html>
+"""
+
+SECTION_CLOSE = """
+    </div>
+"""
+
+# 热榜类板块：标题、标题栏样式、热度单位（全网热榜每条按所属板块的单位显示，并标出来源）
+HOT_SECTIONS = {
+    'global_hot': {'label': '🌐 全网热榜', 'unit': '万', 'show_source': True,
+                   'style': ' style="background: linear-gradient(90deg, #5856d6, #af52de);"'},
+    'hot_news': {'label': '🔥 热点新闻', 'style': '', 'unit': '万热度'},
+    'toutiao_hot': {'label': '📱 今日头条', 'unit': '万',
+                    'style': ' style="background: linear-gradient(90deg, #ff6b35, #f7931e);"'},
+    'douyin_hot': {'label': '🎵 抖音热榜', 'unit': '万',
+                   'style': ' style="background: linear-gradient(90deg, #000, #333);"'},
+}
+
+# 资讯类板块：标题、卡片样式
+ARTICLE_SECTIONS = {
+    'tech_news': {'label': '💻 科技资讯', 'style': '', 'card': 'tech-card'},
+    'ai_news': {'label': '🤖 AI 前沿', 'style': '', 'card': 'ai-card'},
+}
+
+
+def layout(level, hot, tech, ai, tech_summaries, ai_summaries, summary_width):
+    """版式：各板块显示条数、显示摘要的条数和摘要显示宽度（汉字算 2）"""
+    return {
+        'level': level,
+        'hot_limit': hot,
+        'limits': {'tech_news': tech, 'ai_news': ai},
+        'summaries': {'tech_news': tech_summaries, 'ai_news': ai_summaries},
+        'summary_width': summary_width,
+    }
+
+
+# 超出字节预算时依次尝试的版式，从最完整到最精简
+LAYOUTS = (
+    layout(0, 10, 10, 8, 5, 3, 100),
+    layout(1, 10, 10, 8, 5, 3, 60),
+    layout(2, 10, 8, 6, 2, 1, 60),
+    layout(3, 8, 6, 5, 0, 0, 0),
+    layout(4, 6, 5, 4, 0, 0, 0),
+    layout(5, 5, 3, 3, 0, 0, 0),
+)
+DEFAULT_LAYOUT = LAYOUTS[0]
+
+STYLE_PATTERN = re.compile(r'<style>(.*?)</style>', re.S)
+CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+CSS_SPACE = re.compile(r'\s*([{};:,>])\s*')
+WHITESPACE = re.compile(r'\s+')
+LINE_INDENT = re.compile(r'\n\s*')
+BETWEEN_TAGS = re.compile(r'>\s+<')
+HTML_SPECIAL = re.compile('[&<>"\']')
+
+
+def escape(text):
+    """转义插入 HTML 的文本和属性值；绝大多数标题、链接不含特殊字符，先查一遍再转义"""
+    return html_escape(text) if HTML_SPECIAL.search(text) else text
+
+
+def escape_all(*texts):
+    """一次转义一张卡片的全部文本：合起来查一遍，都没有特殊字符时原样返回"""
+    if HTML_SPECIAL.search(''.join(texts)):
+        return [html_escape(text) for text in texts]
+    return texts
+
+
+def minify_css(css):
+    """压缩 CSS：去掉注释和多余空白"""
+    css = CSS_COMMENT.sub('', css)
+    css = CSS_SPACE.sub(r'\1', css)
+    css = WHITESPACE.sub(' ', css)
+    return css.replace(';}', '}').strip()
+
+
+def minify_html(html):
+    """压缩 HTML：去掉换行缩进和标签之间的空白"""
+    return BETWEEN_TAGS.sub('><', LINE_INDENT.sub('', html)).strip()
+
+
+def utf8_size(text):
+    return len(text.encode('utf-8'))
+
+
+# 压缩后的页头，同样只构建一次
+MIN_HEAD = minify_html(STYLE_PATTERN.sub(lambda m: f"<style>{minify_css(m.group(1))}</style>", HEAD))
+MIN_FOOTER = minify_html(FOOTER)
+MIN_SECTION_CLOSE = minify_html(SECTION_CLOSE)
+# 去掉 CSS 的页头：预算连压缩后的页头加一张卡片都放不下时，拆分消息改用它
+BARE_HEAD = STYLE_PATTERN.sub('', MIN_HEAD)
+
+
+def hot_label(news, unit):
+    """热度标签文字（热度在抓取时已经解析成数字）"""
+    return _hot_label(news.heat, news.heat_text, unit)
+
+
+# 同一条热度在每个候选版式、每个订阅者、每种消息格式下的标签都一样
+@functools.lru_cache(maxsize=1024)
+def _hot_label(heat, heat_text, unit):
+    if heat is None:
+        return f"🔥 {heat_text}"
+    if heat >= 10000:
+        return f"🔥 {int(heat) // 10000}{unit}"
+    return f"🔥 {heat_text or int(heat)}"
+
+
+@functools.lru_cache(maxsize=1024)
+def hot_tag(heat, heat_text, unit):
+    """HTML 版的热度标签（转义后），按热度和单位缓存"""
+    return f'<span class="hot-tag">{escape(_hot_label(heat, heat_text, unit))}</span>'
+
+
+@functools.lru_cache(maxsize=1024)
+def topic_tags(tags):
+    """话题标签（转义后），按标签组合缓存"""
+    return ''.join(f'<span class="topic-tag">{escape(tag)}</span>' for tag in tags)
+
+
+# 同一条摘要在每个候选版式、每个订阅者、每种消息格式下都按同样的宽度截断，结果直接复用
+@functools.lru_cache(maxsize=1024)
+def clean_summary(summary, width=100):
+    """按显示宽度截断摘要（抓取时已经清理过、实体已解码成纯文本，这里不再清理，
+    否则摘要里原样的 "<vector>" 之类文字会被当成标签删掉）"""
+    return truncate_display(summary.strip(), width)
+
+
+@functools.lru_cache(maxsize=1024)
+def summary_block(summary, width):
+    """HTML 版的摘要栏（截断、转义后），按摘要和宽度缓存"""
+    return f"""
+            <div class="tech-summary">{escape(clean_summary(summary, width))}</div>
+"""
+
+
+def time_line(now):
+    """时间栏：2025年01月22日 周三 08:00（直接拼接，带中文的格式串交给 strftime 要先编码，慢得多）"""
+    return f"{now.year}年{now.month:02d}月{now.day:02d}日 {WEEKDAYS[now.weekday()]} {now.hour:02d}:{now.minute:02d}"
+
+
+def render_header(out, title, now, minify=False, css=True):
+    header = f"""        <h1>{escape(title)}</h1>
+    </div>
+    <div class="time-bar">
+        {time_line(now)}
+    </div>
+"""
+    if minify:
+        out.append(MIN_HEAD if css else BARE_HEAD)
+        out.append(minify_html(header))
+    else:
+        out.append(HEAD)
+        out.append(header)
+
+
+def render_weather(w, clothing):
+    today, tomorrow = w['today'], w['tomorrow']
+    # 城市和天气描述来自配置和天气接口，同样按文本转义
+    city, temp, weather, humidity, temp_min, temp_max, tomorrow_weather, clothing = escape_all(*map(str, (
+        w['city'], today['temp'], today['weather'], today['humidity'],
+        tomorrow['temp_min'], tomorrow['temp_max'], tomorrow['weather'], clothing)))
+    return f"""
+    <div class="weather-card">
+        <div class="weather-title">🌤️ {city} 天气预报</div>
+        <div class="weather-grid">
+            <div class="weather-item">
+                <div class="weather-day">今天</div>
+                <div class="weather-temp">{temp}°</div>
+                <div class="weather-desc">{weather}</div>
+                <div class="weather-desc">湿度 {humidity}%</div>
+            </div>
+            <div class="weather-item">
+                <div class="weather-day">明天</div>
+                <div class="weather-temp">{temp_min}~{temp_max}°</div>
+                <div class="weather-desc">{tomorrow_weather}</div>
+            </div>
+        </div>
+        <div style="background: rgba(255, 255, 255, 0.2); padding: 12px; border-radius: 12px; margin-top: 12px; text-align: center; font-size: 14px; backdrop-filter: blur(10px);">
+            <div style="opacity: 0.9;">穿衣建议</div>
+            <div style="font-weight: 600; margin-top: 4px;">{clothing}</div>
+        </div>
+    </div>
+"""
+
+
+def section_open(spec, label=None):
+    return f"""
+    <div class="section">
+        <div class="section-header"{spec['style']}>{label or spec['label']}</div>
+"""
+
+
+def sources_line(news, always=False):
+    """多个来源都报道过的新闻，列出全部来源；always=True 时只有一个来源也显示"""
+    sources = news.sources or (news.source_label,)
+    if len(sources) < (1 if always else 2):
+        return ""
+    return f"""
+            <div style="color: #86868b; font-size: 12px; margin-top: 4px;">来源：{escape(' · '.join(sources))}</div>"""
+
+
+def hot_card(spec, idx, news):
+    tag = ""
+    if news.heat is not None or news.heat_text:
+        tag = hot_tag(news.heat, news.heat_text, HOT_SECTIONS.get(news.section, spec)['unit'])
+    if news.tags:
+        tag += topic_tags(news.tags)
+    if len(news.sources) > 1 or 'show_source' in spec:
+        tag += sources_line(news, spec.get('show_source', False))
+    # 前三名特殊标记
+    rank_class = "top" if idx <= 3 else ""
+    # 标题、摘要在抓取时解码成了纯文本，链接原样保存，插入 HTML 的都是转义后的版本
+    return f"""
+        <div class="news-card">
+            <span class="rank {rank_class}">#{idx}</span>
+            <a href="{news.html_url}" class="news-title">{news.html_title}</a>
+            {tag}
+        </div>
+"""
+
+
+def article_card(spec, idx, news, summary):
+    """文章卡片；summary 为 summary_block 生成的摘要栏，不显示摘要时为空"""
+    url = news.html_url
+    return f"""
+        <div class="{spec['card']}">
+            <div class="tech-number">[{idx:02d}]{topic_tags(news.tags) if news.tags else ""}</div>
+            <div class="tech-title">
+                <a href="{url}">{news.html_title}</a>
+            </div>
+{summary}
+            <a href="{url}" class="read-more">阅读全文 →</a>{sources_line(news) if len(news.sources) > 1 else ""}
+        </div>
+"""
+
+
+def section_cards(name, items, layout=DEFAULT_LAYOUT):
+    """按版式生成一个板块的全部卡片"""
+    if name in HOT_SECTIONS:
+        spec = HOT_SECTIONS[name]
+        return [hot_card(spec, idx, news) for idx, news in enumerate(items[:layout['hot_limit']], 1)]
+
+    spec = ARTICLE_SECTIONS[name]
+    # 只在前几条显示摘要
+    summaries, width = layout['summaries'][name], layout['summary_width']
+    return [article_card(spec, idx, news, summary_block(news.summary, width) if news.summary and idx <= summaries else "")
+            for idx, news in enumerate(items[:layout['limits'][name]], 1)]
+
+
+def section_html(name, items, layout=DEFAULT_LAYOUT):
+    spec = HOT_SECTIONS.get(name) or ARTICLE_SECTIONS[name]
+    return ''.join([section_open(spec), *section_cards(name, items, layout), SECTION_CLOSE])
+
+
+class MessageRenderer:
+    """带片段缓存的渲染器，可在多个订阅者、多次渲染之间共享"""
+
+    def __init__(self, max_fragments=256):
+        self.max_fragments = max_fragments
+        self.fragments = {}
+        self.lock = threading.Lock()
+
+    def _fragment(self, key, build, minify=False):
+        """按内容缓存板块片段；key 需要包含 minify"""
+        fragment = self.fragments.get(key)
+        if fragment is None:
+            fragment = build()
+            if minify:
+                fragment = minify_html(fragment)
+            with self.lock:
+                if len(self.fragments) >= self.max_fragments:
+                    self.fragments.clear()
+                self.fragments[key] = fragment
+        return fragment
+
+    def _weather_fragment(self, fetcher, weather, minify):
+        clothing = fetcher.get_clothing_suggestion(weather['today']['temp'])
+        key = ('weather', minify, weather['city'], *weather['today'].values(), *weather['tomorrow'].values(), clothing)
+        return self._fragment(key, lambda: render_weather(weather, clothing), minify)
+
+    def render(self, fetcher, title, sections, weather, now=None, layout=DEFAULT_LAYOUT, minify=False):
+        """渲染完整消息；sections 为要显示的板块"""
+        out = []
+        render_header(out, title, now or datetime.now(), minify)
+
+        if weather and 'weather' in sections:
+            out.append(self._weather_fragment(fetcher, weather, minify))
+
+        for name in (*HOT_SECTIONS, *ARTICLE_SECTIONS):
+            items = getattr(fetcher, name)
+            if items and name in sections:
+                key = (name, layout['level'], minify, *[n.render_key for n in items[:10]])
+                out.append(self._fragment(key, lambda: section_html(name, items, layout), minify))
+
+        out.append(MIN_FOOTER if minify else FOOTER)
+        return ''.join(out)
+
+    def render_parts(self, fetcher, title, sections, weather, budget, now=None):
+        """按字节预算渲染，返回 [(标题, 内容)]
+
+        先压缩 CSS/HTML，再逐级减少条数和摘要；最精简的版式仍超出预算时，
+        按完整版式拆成多条编号消息，不丢内容
+        """
+        now = now or datetime.now()
+        for candidate in LAYOUTS:
+            html = self.render(fetcher, title, sections, weather, now=now, layout=candidate, minify=True)
+            if utf8_size(html) <= budget:
+                if candidate is not DEFAULT_LAYOUT:
+                    print(f"消息超出 {budget} 字节，已精简为第 {candidate['level']} 档版式")
+                return [(title, html)]
+        return self._split(fetcher, title, sections, weather, budget, now)
+
+    def _split(self, fetcher, title, sections, weather, budget, now):
+        """把各板块按卡片装进多条消息，板块跨消息时在下一条加“（续）”
+
+        预算小于“压缩后的页头 + 页脚 + 最大的一张卡片”时去掉 CSS 再拆；
+        去掉 CSS 仍放不下时照常每条一张卡片，并提示这些消息会超出预算
+        """
+        css = True
+
+        def header(part_title):
+            out = []
+            render_header(out, part_title, now, minify=True, css=css)
+            return ''.join(out)
+
+        close_size = utf8_size(MIN_SECTION_CLOSE)
+        fragment = None
+        if weather and 'weather' in sections:
+            fragment = self._weather_fragment(fetcher, weather, minify=True)
+        blocks = []
+        largest = utf8_size(fragment) if fragment else 0
+        for name in (*HOT_SECTIONS, *ARTICLE_SECTIONS):
+            items = getattr(fetcher, name)
+            if not items or name not in sections:
+                continue
+            spec = HOT_SECTIONS.get(name) or ARTICLE_SECTIONS[name]
+            cards = [minify_html(card) for card in section_cards(name, items)]
+            opener_size = utf8_size(minify_html(section_open(spec, f"{spec['label']}（续）")))
+            largest = max(largest, opener_size + close_size + max(map(utf8_size, cards)))
+            blocks.append((spec, cards))
+
+        fixed = utf8_size(header(f"{title}（00/00）")) + utf8_size(MIN_FOOTER)
+        if fixed + largest > budget:
+            css = False
+            fixed = utf8_size(header(f"{title}（00/00）")) + utf8_size(MIN_FOOTER)
+            print(f"消息预算 {budget} 字节放不下页头样式（{utf8_size(MIN_HEAD)} 字节），拆分的消息不带 CSS")
+            if fixed + largest > budget:
+                print(f"警告: 消息预算 {budget} 字节小于单张卡片所需的 {fixed + largest} 字节，部分消息仍会超出预算")
+
+        pages = []
+        page = []
+        used = fixed
+
+        if fragment:
+            page.append(fragment)
+            used += utf8_size(fragment)
+
+        for spec, cards in blocks:
+            label = spec['label']
+            opened = False
+            for card in cards:
+                opener = minify_html(section_open(spec, label))
+                need = utf8_size(card) + close_size + (0 if opened else utf8_size(opener))
+                if page and used + need > budget:
+                    if opened:
+                        page.append(MIN_SECTION_CLOSE)
+                    pages.append(page)
+                    page, used, opened = [], fixed, False
+                    label = f"{spec['label']}（续）"
+                    opener = minify_html(section_open(spec, label))
+                if not opened:
+                    page.append(opener)
+                    used += utf8_size(opener)
+                    opened = True
+                page.append(card)
+                used += utf8_size(card)
+            if opened:
+                page.append(MIN_SECTION_CLOSE)
+                used += close_size
+        if page:
+            pages.append(page)
+
+        total = len(pages)
+        print(f"消息超出 {budget} 字节，拆分为 {total} 条")
+        parts = []
+        for idx, page in enumerate(pages, 1):
+            part_title = f"{title}（{idx}/{total}）" if total > 1 else title
+            parts.append((part_title, header(part_title) + ''.join(page) + MIN_FOOTER))
+        return parts
+
+
+_default_renderer = MessageRenderer()
+_format_renderers = {'html': _default_renderer}
+
+
+def get_default_renderer():
+    """进程内共享的渲染器"""
+    return _default_renderer
+
+
+def get_renderer(fmt='html'):
+    """按消息格式取进程内共享的渲染器；markdown / text 在第一次用到时才加载"""
+    renderer = _format_renderers.get(fmt)
+    if renderer is None:
+        from text_renderer import STYLES, TextRenderer
+        if fmt not in STYLES:
+            raise ValueError(f"未知的消息格式: {fmt}")
+        renderer = _format_renderers.setdefault(fmt, TextRenderer(fmt))
+    return renderer
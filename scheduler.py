@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻模式的调度器
+按推送时刻表运行：每个时刻之前提前一段时间开始抓取和渲染，到点准时推送；
+两次推送之间低频刷新新闻源，让连接池、DNS 和 RSS 缓存保持预热
+"""
+
+import time
+from datetime import datetime, timedelta
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python 3.8
+    ZoneInfo = None
+
+
+def parse_times(text):
+    """"08:00,20:00" → [(8, 0), (20, 0)]"""
+    slots = []
+    for part in text.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        hour, minute = part.split(':')
+        hour, minute = int(hour), int(minute)
+        if not (0 <= hour < 24 and 0 <= minute < 60):
+            raise ValueError(f"推送时间格式错误: {part}")
+        slots.append((hour, minute))
+    if not slots:
+        raise ValueError("没有配置推送时间")
+    return sorted(set(slots))
+
+
+def get_timezone(name):
+    if not name or ZoneInfo is None:
+        return None
+    return ZoneInfo(name)
+
+
+def next_slot(slots, now):
+    """now 之后（不含）最近的推送时刻，now 为带时区的 datetime"""
+    for days in (0, 1):
+        day = now.date() + timedelta(days=days)
+        for hour, minute in slots:
+            slot = datetime(day.year, day.month, day.day, hour, minute, tzinfo=now.tzinfo)
+            if slot > now:
+                return slot
+    raise ValueError("没有配置推送时间")
+
+
+class Scheduler:
+    """常驻调度：run_edition(推送时刻) 在提前 lead 秒时调用，refresh() 在空闲时每隔 refresh_interval 秒调用"""
+
+    def __init__(self, slots, run_edition, refresh=None, lead=300, refresh_interval=1800, tz=None):
+        self.slots = slots
+        self.run_edition = run_edition
+        self.refresh = refresh
+        self.lead = lead
+        self.refresh_interval = refresh_interval
+        self.tz = tz
+        self.last_refresh = time.time()
+        self.last_slot = None  # 上一期的推送时刻，提前跑完的一期不会被再次选中
+
+    def now(self):
+        return datetime.now(self.tz) if self.tz else datetime.now().astimezone()
+
+    def run_forever(self):
+        print(f"常驻模式：推送时间 {', '.join(f'{h:02d}:{m:02d}' for h, m in self.slots)}，"
+              f"提前 {self.lead} 秒开始抓取")
+        while True:
+            self.run_once()
+
+    def run_once(self):
+        """等到下一个推送时刻并运行一期"""
+        now = self.now()
+        slot = next_slot(self.slots, max(now, self.last_slot) if self.last_slot else now)
+        start_at = slot.timestamp() - self.lead
+        print(f"下一期 {slot.strftime('%Y-%m-%d %H:%M %Z')}")
+        self._idle_until(start_at)
+        try:
+            self.run_edition(slot)
+        except Exception as e:
+            # 单期失败不影响下一期
+            print(f"本期运行出错: {str(e)}")
+        self.last_slot = slot
+        self.last_refresh = time.time()
+
+    def _idle_until(self, deadline):
+        """空闲等待，期间按间隔刷新；刷新不会跨过开始抓取的时间"""
+        while True:
+            now = time.time()
+            if now >= deadline:
+                return
+            if self.refresh and self.refresh_interval:
+                next_refresh = self.last_refresh + self.refresh_interval
+                # 离开始抓取不到一个刷新间隔时不再刷新，本期抓取本身就会预热
+                if next_refresh <= now and deadline - now > self.refresh_interval / 2:
+                    try:
+                        self.refresh()
+                    except Exception as e:
+                        print(f"后台刷新出错: {str(e)}")
+                    self.last_refresh = time.time()
+                    continue
+                wake = min(deadline, next_refresh) if deadline - now > self.refresh_interval / 2 else deadline
+            else:
+                wake = deadline
+            time.sleep(max(0.0, min(wake - now, 60)))
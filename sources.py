@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+新闻源注册表
+每个板块的新闻源在 sources.json 里声明：地址、解析方式（json 按路径取字段 / rss）和字段映射，
+新增或替换新闻源只需要改配置。字段路径和链接模板在启动时编译一次；
+解析器按类型懒加载，没有启用的源用到的解析模块（XML、feedparser、自定义适配器）不会被导入
+"""
+
+import importlib
+import json
+import os
+import re
+
+
+DEFAULT_SOURCES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sources.json')
+DEFAULT_TIMEOUT = 10
+
+# 字段路径：data.cards[].content（[] 展开列表）、weatherDesc[0].value（按下标取）
+PATH_SEGMENT = re.compile(r'^([^\[\]]*)((?:\[\d*\])*)$')
+PATH_INDEX = re.compile(r'\[(\d*)\]')
+# 链接模板：https://www.zhihu.com/question/{target.id}
+TEMPLATE_FIELD = re.compile(r'\{([^{}]+)\}')
+
+_EXPAND = object()
+
+# 字段映射可用的新闻字段，title 和 url 必填
+ITEM_FIELDS = ('title', 'url', 'hot', 'summary', 'published')
+
+
+class SourceError(Exception):
+    """新闻源返回了错误的状态或无法解析的内容"""
+
+
+def compile_path(path):
+    """把字段路径编译成取值函数，返回所有匹配的值（列表）"""
+    steps = []
+    for part in filter(None, path.split('.')):
+        match = PATH_SEGMENT.match(part)
+        if not match:
+            raise ValueError(f"字段路径格式错误: {path}")
+        name, brackets = match.groups()
+        if name:
+            steps.append(name)
+        for index in PATH_INDEX.findall(brackets):
+            steps.append(int(index) if index else _EXPAND)
+
+    def resolve(data):
+        values = [data]
+        for step in steps:
+            found = []
+            for value in values:
+                if step is _EXPAND:
+                    if isinstance(value, list):
+                        found.extend(value)
+                elif isinstance(step, int):
+                    if isinstance(value, list) and step < len(value):
+                        found.append(value[step])
+                elif isinstance(value, dict) and step in value:
+                    found.append(value[step])
+            values = found
+        return values
+    return resolve
+
+
+def check_fields(fields):
+    unknown = set(fields) - set(ITEM_FIELDS)
+    if unknown:
+        raise ValueError(f"未知的新闻字段: {', '.join(sorted(unknown))}")
+    if 'title' not in fields or 'url' not in fields:
+        raise ValueError("字段映射必须包含 title 和 url")
+    return fields
+
+
+def compile_field(expr):
+    """字段映射：路径（取第一个值）或带 {路径} 的模板，编译成 item -> 值 的函数"""
+    if '{' not in expr:
+        resolve = compile_path(expr)
+
+        def field(item):
+            values = resolve(item)
+            return values[0] if values else ''
+        return field
+
+    pieces = TEMPLATE_FIELD.split(expr)
+    # 奇数位置是路径，偶数位置是原样保留的文字
+    parts = [compile_field(piece) if idx % 2 else piece for idx, piece in enumerate(pieces)]
+
+    def template(item):
+        return ''.join(part if isinstance(part, str) else str(part(item)) for part in parts)
+    return template
+
+
+class JsonParser:
+    """JSON 接口：items 路径取出条目列表，fields 把每个条目映射成 title/url/hot/summary/published"""
+
+    def __init__(self, spec):
+        items = compile_path(spec.get('items', ''))
+        # 路径最后一层是列表时自动展开
+        self.items = lambda data: [item for value in items(data)
+                                   for item in (value if isinstance(value, list) else [value])]
+        self.fields = {name: compile_field(expr) for name, expr in check_fields(spec['fields']).items()}
+
+    def fetch(self, http, source, limit):
+        response = http.get(source.url, headers=source.headers, timeout=source.timeout)
+        if response.status_code != 200:
+            raise SourceError(f"{source.name} 返回 {response.status_code}")
+        entries = []
+        for item in self.items(response.json()):
+            if len(entries) >= limit:
+                break
+            entries.append({name: field(item) for name, field in self.fields.items()})
+        return entries
+
+
+class RssParser:
+    """RSS/Atom：流式解析，fields 为 新闻字段 -> 条目字段（默认标题、链接、摘要、发布时间）"""
+
+    DEFAULT_FIELDS = {'title': 'title', 'url': 'link', 'summary': 'summary', 'published': 'published'}
+
+    def __init__(self, spec):
+        self.fields = check_fields(dict(spec.get('fields') or self.DEFAULT_FIELDS))
+
+    def fetch(self, http, source, limit):
+        feed = http.get_feed(source.url, headers=source.headers, limit=limit, timeout=source.timeout)
+        return [{name: entry.get(key, '') for name, key in self.fields.items()} for entry in feed.entries[:limit]]
+
+
+# 内置解析器；type 也可以写成 "模块:类" 使用自定义适配器，有启用的源用到时才导入
+PARSERS = {
+    'json': JsonParser,
+    'rss': RssParser,
+}
+
+
+def load_parser(kind):
+    """按类型取解析器类"""
+    cls = PARSERS.get(kind)
+    if cls is None:
+        if ':' not in kind:
+            raise ValueError(f"未知的解析方式: {kind}")
+        module, name = kind.split(':', 1)
+        cls = PARSERS[kind] = getattr(importlib.import_module(module), name)
+    return cls
+
+
+class Source:
+    """一个新闻源：地址、请求头和编译好的解析器"""
+
+    __slots__ = ('id', 'name', 'label', 'url', 'headers', 'timeout', 'limit', 'parser')
+
+    def __init__(self, spec):
+        self.id = spec['id']
+        self.name = spec.get('name', self.id)
+        self.label = spec.get('label', self.name)  # 卡片上显示的来源简称
+        self.url = spec['url']
+        self.headers = spec.get('headers')
+        self.timeout = spec.get('timeout', DEFAULT_TIMEOUT)
+        self.limit = spec.get('limit')  # 单个源最多取几条，默认按板块条数平均分配
+        self.parser = load_parser(spec.get('type', 'json'))(spec)
+
+    def fetch(self, http, limit):
+        """请求并解析，返回 [{'title':..., 'url':..., ...}]；失败时抛出异常"""
+        return self.parser.fetch(http, self, min(limit, self.limit or limit))
+
+    def __repr__(self):
+        return f"Source({self.id!r}, {self.url!r})"
+
+
+class Section:
+    """一个板块的新闻源：sources 按顺序合并，全部失败时改用 backup"""
+
+    __slots__ = ('name', 'label', 'sources', 'backup')
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.label = spec.get('label', name)
+        self.sources = [Source(s) for s in spec.get('sources', []) if s.get('enabled', True)]
+        self.backup = [Source(s) for s in spec.get('backup', []) if s.get('enabled', True)]
+
+
+class SourceRegistry:
+    """全部板块的新闻源，启动时编译一次"""
+
+    def __init__(self, config):
+        self.sections = {name: Section(name, spec) for name, spec in config.items()}
+
+    def section(self, name):
+        return self.sections.get(name)
+
+    def has_backup(self, name):
+        section = self.sections.get(name)
+        return bool(section and section.backup)
+
+
+def load_registry(path=None):
+    """读取新闻源配置（默认为项目目录下的 sources.json）"""
+    with open(path or DEFAULT_SOURCES_FILE, 'r', encoding='utf-8') as f:
+        return SourceRegistry(json.load(f))
+
+
+_default_registry = None
+
+
+def get_default_registry():
+    """进程内共享的默认注册表"""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = load_registry()
+    return _default_registry
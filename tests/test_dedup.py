@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""跨来源去重：真正的重复要合并，只差一个词或一个数字的不同新闻不能合并"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from dedup import cluster_titles, merge_duplicate_stories
+from news_item import make_item
+
+
+DUPLICATES = [
+    ('如何看待华为发布 Mate 70 系列手机？', '华为发布Mate70系列手机'),
+    ('神舟十九号载人飞船发射成功', '神舟十九号飞船发射成功'),
+    ('2025 年研究生考试报名人数公布', '2025年研究生考试报名人数公布：388万人'),
+    ('央行宣布降准 0.5 个百分点', '央行宣布降准0.5个百分点，释放长期资金约1万亿元'),
+    ('OpenAI 发布 GPT-5', 'OpenAI正式发布GPT-5模型'),
+]
+
+NEAR_MISSES = [
+    ('小米发布新手机', '华为发布新手机'),
+    ('苹果发布iPhone 16', '苹果发布iPhone 17'),
+    ('第十五届珠海航展开幕', '第十五届珠海航展闭幕'),
+    ('2024 年高考报名人数公布', '2025 年高考报名人数公布'),
+]
+
+
+@pytest.mark.parametrize('a, b', DUPLICATES)
+def test_duplicates_merge(a, b):
+    assert cluster_titles([a, b]) == [[0, 1]]
+
+
+@pytest.mark.parametrize('a, b', NEAR_MISSES)
+def test_near_misses_stay_apart(a, b):
+    assert cluster_titles([a, b]) == [[0], [1]]
+
+
+def fetcher(**sections):
+    empty = {name: [] for name in ('hot_news', 'toutiao_hot', 'douyin_hot', 'tech_news', 'ai_news')}
+    for section, titles in sections.items():
+        empty[section] = [make_item(section, section, rank, title, f'https://example.com/{section}/{rank}')
+                          for rank, title in enumerate(titles, 1)]
+    return SimpleNamespace(**empty)
+
+
+def test_merge_keeps_first_card_and_records_sources():
+    f = fetcher(hot_news=['如何看待华为发布 Mate 70 系列手机？', '小米发布新手机'],
+                toutiao_hot=['华为发布Mate70系列手机', '华为发布新手机'],
+                douyin_hot=['苹果发布iPhone 17'])
+    f.hot_news[0] = f.hot_news[0].replace(label='知乎')
+    f.toutiao_hot[0] = f.toutiao_hot[0].replace(label='头条')
+
+    assert merge_duplicate_stories(f) == 1
+    assert [n.title for n in f.hot_news] == ['如何看待华为发布 Mate 70 系列手机？', '小米发布新手机']
+    assert f.hot_news[0].sources == ('知乎', '头条')
+    assert [n.title for n in f.toutiao_hot] == ['华为发布新手机']
+    assert [n.title for n in f.douyin_hot] == ['苹果发布iPhone 17']
+
+
+def test_merge_prefers_ai_section():
+    f = fetcher(tech_news=['OpenAI正式发布GPT-5模型', '苹果发布iPhone 16'], ai_news=['OpenAI 发布 GPT-5'])
+
+    assert merge_duplicate_stories(f) == 1
+    assert [n.title for n in f.ai_news] == ['OpenAI 发布 GPT-5']
+    assert [n.title for n in f.tech_news] == ['苹果发布iPhone 16']
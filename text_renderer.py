@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Markdown / 纯文本渲染
+Server酱的 desp 字段是 Markdown，Webhook 机器人只认纯文本；和 HTML 渲染共用板块定义、版式和热度标签，
+板块片段同样按内容缓存，超出字节预算时逐级精简，仍超出时按条目拆成多条消息
+"""
+
+import threading
+from datetime import datetime
+
+from renderer import (ARTICLE_SECTIONS, DEFAULT_LAYOUT, HOT_SECTIONS, LAYOUTS, clean_summary, hot_label, time_line,
+                      utf8_size)
+
+
+def md_escape(text):
+    """链接文字中的方括号会打断 Markdown 链接"""
+    return text.replace('[', '\\[').replace(']', '\\]')
+
+
+def md_url(url):
+    """链接地址中的空格和括号会打断 Markdown 链接（抖音搜索链接里带原始关键词）"""
+    return url.replace(' ', '%20').replace('(', '%28').replace(')', '%29')
+
+
+def topic_names(news):
+    """话题标签，和 HTML 版的标签一致"""
+    return ' '.join(f"#{tag}" for tag in news.tags)
+
+
+def source_names(news, always=False):
+    """和 HTML 版一致：多来源报道时列出来源；always=True 时只有一个来源也列出"""
+    sources = news.sources or (news.source_label,)
+    return ' · '.join(sources) if len(sources) >= (1 if always else 2) else ''
+
+
+class MarkdownStyle:
+    """紧凑的 Markdown（Server酱）"""
+
+    @staticmethod
+    def header(title, now):
+        return f"# {title}\n\n{time_line(now)}"
+
+    @staticmethod
+    def weather(w, clothing):
+        return (f"## 🌤️ {w['city']} 天气\n\n"
+                f"- 今天：{w['today']['temp']}°，{w['today']['weather']}，湿度 {w['today']['humidity']}%\n"
+                f"- 明天：{w['tomorrow']['temp_min']}~{w['tomorrow']['temp_max']}°，{w['tomorrow']['weather']}\n"
+                f"- 穿衣建议：{clothing}")
+
+    @staticmethod
+    def heading(label):
+        return f"## {label}"
+
+    @staticmethod
+    def hot_item(idx, news, heat, sources):
+        line = f"{idx}. [{md_escape(news.title)}]({md_url(news.url)})"
+        if heat:
+            line += f" {heat}"
+        if news.tags:
+            line += f" {topic_names(news)}"
+        if sources:
+            line += f"（{sources}）"
+        return line
+
+    @staticmethod
+    def article_item(idx, news, summary, sources):
+        line = f"{idx}. [{md_escape(news.title)}]({md_url(news.url)})"
+        if news.tags:
+            line += f" {topic_names(news)}"
+        if sources:
+            line += f"（{sources}）"
+        if summary:
+            line += f"\n   > {summary}"
+        return line
+
+
+class TextStyle:
+    """纯文本（Webhook），链接单独一行方便聊天软件识别"""
+
+    @staticmethod
+    def header(title, now):
+        return f"{title}\n{time_line(now)}"
+
+    @staticmethod
+    def weather(w, clothing):
+        return (f"【🌤️ {w['city']} 天气】\n"
+                f"今天 {w['today']['temp']}° {w['today']['weather']} 湿度 {w['today']['humidity']}%\n"
+                f"明天 {w['tomorrow']['temp_min']}~{w['tomorrow']['temp_max']}° {w['tomorrow']['weather']}\n"
+                f"穿衣建议：{clothing}")
+
+    @staticmethod
+    def heading(label):
+        return f"【{label}】"
+
+    @staticmethod
+    def hot_item(idx, news, heat, sources):
+        line = f"{idx}. {news.title}"
+        if heat:
+            line += f" {heat}"
+        if news.tags:
+            line += f" {topic_names(news)}"
+        if sources:
+            line += f"（{sources}）"
+        return f"{line}\n   {news.url}"
+
+    @staticmethod
+    def article_item(idx, news, summary, sources):
+        line = f"{idx}. {news.title}"
+        if news.tags:
+            line += f" {topic_names(news)}"
+        if sources:
+            line += f"（{sources}）"
+        if summary:
+            line += f"\n   {summary}"
+        return f"{line}\n   {news.url}"
+
+
+STYLES = {
+    'markdown': MarkdownStyle,
+    'text': TextStyle,
+}
+
+
+class TextRenderer:
+    """Markdown / 纯文本渲染器，接口与 MessageRenderer 相同"""
+
+    def __init__(self, fmt='markdown', max_fragments=256):
+        self.style = STYLES[fmt]
+        self.max_fragments = max_fragments
+        self.fragments = {}
+        self.lock = threading.Lock()
+
+    def section_items(self, name, items, layout=DEFAULT_LAYOUT):
+        """按版式生成一个板块的全部条目"""
+        style = self.style
+        if name in HOT_SECTIONS:
+            spec = HOT_SECTIONS[name]
+            lines = []
+            for idx, news in enumerate(items[:layout['hot_limit']], 1):
+                heat = ''
+                if news.heat is not None or news.heat_text:
+                    heat = hot_label(news, HOT_SECTIONS.get(news.section, spec)['unit'])
+                lines.append(style.hot_item(idx, news, heat, source_names(news, spec.get('show_source', False))))
+            return lines
+
+        lines = []
+        for idx, news in enumerate(items[:layout['limits'][name]], 1):
+            summary = ''
+            if news.summary and idx <= layout['summaries'][name]:
+                summary = clean_summary(news.summary, layout['summary_width'])
+            lines.append(style.article_item(idx, news, summary, source_names(news)))
+        return lines
+
+    def _section(self, name, items, layout):
+        key = (name, layout['level'], *[n.render_key for n in items[:10]])
+        fragment = self.fragments.get(key)
+        if fragment is None:
+            spec = HOT_SECTIONS.get(name) or ARTICLE_SECTIONS[name]
+            fragment = '\n\n'.join([self.style.heading(spec['label']), '\n'.join(self.section_items(name, items, layout))])
+            with self.lock:
+                if len(self.fragments) >= self.max_fragments:
+                    self.fragments.clear()
+                self.fragments[key] = fragment
+        return fragment
+
+    def render(self, fetcher, title, sections, weather, now=None, layout=DEFAULT_LAYOUT, minify=False):
+        """渲染完整消息；minify 只为与 HTML 版接口一致，文本没有可压缩的部分"""
+        blocks = [self.style.header(title, now or datetime.now())]
+        if weather and 'weather' in sections:
+            blocks.append(self.style.weather(weather, fetcher.get_clothing_suggestion(weather['today']['temp'])))
+        for name in (*HOT_SECTIONS, *ARTICLE_SECTIONS):
+            items = getattr(fetcher, name)
+            if items and name in sections:
+                blocks.append(self._section(name, items, layout))
+        return '\n\n'.join(blocks) + '\n'
+
+    def render_parts(self, fetcher, title, sections, weather, budget, now=None):
+        """按字节预算渲染，返回 [(标题, 内容)]；逐级精简版式，仍超出时按条目拆成多条"""
+        now = now or datetime.now()
+        for candidate in LAYOUTS:
+            text = self.render(fetcher, title, sections, weather, now=now, layout=candidate)
+            if utf8_size(text) <= budget:
+                if candidate is not DEFAULT_LAYOUT:
+                    print(f"消息超出 {budget} 字节，已精简为第 {candidate['level']} 档版式")
+                return [(title, text)]
+        return self._split(fetcher, title, sections, weather, budget, now)
+
+    def _split(self, fetcher, title, sections, weather, budget, now):
+        fixed = utf8_size(self.style.header(f"{title}（00/00）", now)) + 2
+        pages = []
+        page = []
+        used = fixed
+
+        def add(block, follow=False):
+            """follow=True 表示接在同一板块的上一条后面；返回是否开了新的一条消息"""
+            nonlocal page, used
+            size = utf8_size(block) + (1 if follow else 2)
+            if page and used + size > budget:
+                pages.append(page)
+                page, used = [], fixed
+            if follow and page:
+                page[-1] += '\n' + block
+                used += size
+                return False
+            page.append(block)
+            used += utf8_size(block) + 2
+            return True
+
+        if weather and 'weather' in sections:
+            add(self.style.weather(weather, fetcher.get_clothing_suggestion(weather['today']['temp'])))
+        for name in (*HOT_SECTIONS, *ARTICLE_SECTIONS):
+            items = getattr(fetcher, name)
+            if not items or name not in sections:
+                continue
+            label = (HOT_SECTIONS.get(name) or ARTICLE_SECTIONS[name])['label']
+            for idx, line in enumerate(self.section_items(name, items)):
+                # 板块标题和第一条放在一起，避免标题落在上一条消息末尾；换页后补一个“（续）”标题
+                if idx == 0:
+                    add(f"{self.style.heading(label)}\n\n{line}")
+                elif add(line, follow=True):
+                    page[-1] = f"{self.style.heading(f'{label}（续）')}\n\n{line}"
+                    used += utf8_size(page[-1]) - utf8_size(line)
+        if page:
+            pages.append(page)
+
+        total = len(pages)
+        print(f"消息超出 {budget} 字节，拆分为 {total} 条")
+        parts = []
+        for idx, page in enumerate(pages, 1):
+            part_title = f"{title}（{idx}/{total}）" if total > 1 else title
+            parts.append((part_title, '\n\n'.join([self.style.header(part_title, now), *page]) + '\n'))
+        return parts
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+话题分类
+可配置的话题词表（AI、芯片、新能源车、财经……）在启动时编译成一个 Aho-Corasick 自动机，
+每条新闻的标题和摘要只扫描一遍就能得到全部命中的话题，词表增加到成百上千个词也不会变慢
+"""
+
+import json
+from collections import deque
+
+
+# 默认话题词表：话题 id -> 显示名称和关键词（英文关键词不区分大小写，按整词匹配）
+DEFAULT_TOPICS = {
+    'ai': {
+        'label': 'AI',
+        'keywords': ['AI', 'AIGC', '人工智能', '机器学习', '深度学习', '神经网络', 'ChatGPT', 'GPT', 'OpenAI',
+                     'LLM', '大模型', '智能体', '生成式', 'DeepSeek', 'Gemini', 'Sora', '文心一言', '通义千问',
+                     '具身智能'],
+    },
+    'chip': {
+        'label': '芯片',
+        'keywords': ['芯片', '半导体', '晶圆', '光刻', '制程', 'GPU', 'CPU', 'NPU', '处理器', '英伟达', 'NVIDIA',
+                     '台积电', 'TSMC', '中芯国际', '高通', '算力'],
+    },
+    'ev': {
+        'label': '新能源车',
+        'keywords': ['新能源车', '新能源汽车', '电动车', '电动汽车', '特斯拉', 'Tesla', '比亚迪', '蔚来', '小鹏',
+                     '理想汽车', '问界', '智驾', '自动驾驶', '充电桩', '动力电池', '宁德时代'],
+    },
+    'finance': {
+        'label': '财经',
+        'keywords': ['股市', 'A股', '港股', '美股', '央行', '美联储', '降息', '加息', '利率', '汇率', '基金', '债券',
+                     'IPO', '上市', '财报', '融资', '营收'],
+    },
+    'phone': {
+        'label': '手机',
+        'keywords': ['手机', 'iPhone', '折叠屏', '鸿蒙', 'HarmonyOS', 'Android', '安卓'],
+    },
+    'space': {
+        'label': '航天',
+        'keywords': ['航天', '火箭', '卫星', '空间站', '神舟', '嫦娥', 'SpaceX', '星舰'],
+    },
+}
+
+
+def load_topics(path=None):
+    """默认词表，可用 JSON 文件覆盖或新增话题（keywords 为空的话题会被关闭）"""
+    topics = {topic: dict(spec) for topic, spec in DEFAULT_TOPICS.items()}
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            for topic, spec in json.load(f).items():
+                topics[topic] = {'label': spec.get('label', topic), 'keywords': list(spec.get('keywords', []))}
+    return {topic: spec for topic, spec in topics.items() if spec['keywords']}
+
+
+def _is_word_char(ch):
+    return ch.isascii() and ch.isalnum()
+
+
+class AhoCorasick:
+    """多模式匹配自动机：构建一次，之后每段文本线性扫描一遍"""
+
+    def __init__(self, patterns):
+        # patterns: [(关键词, 值)]
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [()]
+        for word, value in patterns:
+            node = 0
+            for ch in word:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(())
+                node = nxt
+            self.output[node] += ((len(word), value),)
+
+        # 按层构建失败指针，并把失败链上的输出合并进来
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                fallback = self.fail[node]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nxt] = self.goto[fallback].get(ch, 0)
+                self.output[nxt] += self.output[self.fail[nxt]]
+
+    def finditer(self, text):
+        """依次产出 (起点, 终点, 值)"""
+        goto, fail, output = self.goto, self.fail, self.output
+        node = 0
+        for end, ch in enumerate(text, 1):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length, value in output[node]:
+                yield end - length, end, value
+
+
+class TopicClassifier:
+    """把新闻按话题打标签"""
+
+    def __init__(self, topics=None):
+        self.topics = load_topics() if topics is None else topics
+        self.order = {topic: idx for idx, topic in enumerate(self.topics)}
+        patterns = []
+        for topic, spec in self.topics.items():
+            for keyword in spec['keywords']:
+                word = keyword.lower()
+                # 纯英文/数字的关键词需要整词匹配，避免 "ai" 命中 "said"
+                patterns.append((word, (topic, all(_is_word_char(ch) for ch in word))))
+        self.automaton = AhoCorasick(patterns)
+
+    def classify_text(self, text):
+        """文本命中的话题，按词表顺序返回"""
+        text = text.lower()
+        found = set()
+        for start, end, (topic, whole_word) in self.automaton.finditer(text):
+            if topic in found:
+                continue
+            if whole_word and ((start > 0 and _is_word_char(text[start - 1])) or
+                               (end < len(text) and _is_word_char(text[end]))):
+                continue
+            found.add(topic)
+        return tuple(sorted(found, key=self.order.get))
+
+    def classify(self, item):
+        """一条新闻（标题 + 摘要）的话题"""
+        text = item.title
+        if item.summary:
+            text += '\n' + item.summary
+        return self.classify_text(text)
+
+    def label(self, topic):
+        return self.topics[topic]['label']
+
+
+_default_classifier = None
+
+
+def get_default_classifier():
+    """进程内共享的默认分类器（默认词表）"""
+    global _default_classifier
+    if _default_classifier is None:
+        _default_classifier = TopicClassifier()
+    return _default_classifier
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按城市缓存天气
+保存解析后的天气（今天实况 + 明天预报），同一城市的多个订阅者、相邻几次运行共用一次请求；
+过期不久的缓存先直接使用，同时在后台刷新（stale-while-revalidate）
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import date
+
+from atomic_file import save_json
+
+
+class WeatherCache:
+    """持久化到本地 JSON 文件的天气缓存
+
+    ttl 秒内的缓存直接使用；过期后 stale 秒内仍先返回旧数据并在后台刷新，再久就同步重新获取。
+    “明天”的含义跨天会变，所以只复用当天获取的数据
+    """
+
+    def __init__(self, path, ttl=1800, stale=7200):
+        self.path = path
+        self.ttl = ttl
+        self.stale = stale
+        self.lock = threading.Lock()
+        self.cities = {}
+        self.pending = {}  # 城市 -> 正在后台刷新的线程
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.cities = json.load(f)
+            except Exception as e:
+                print(f"读取天气缓存失败，忽略旧缓存: {str(e)}")
+
+    def get(self, city):
+        """返回 (天气, 是否新鲜)；没有可用缓存时返回 (None, False)"""
+        with self.lock:
+            record = self.cities.get(city)
+            if record is None or record.get('date') != date.today().isoformat():
+                self.misses += 1
+                return None, False
+            age = time.time() - record['fetched_at']
+            if age < self.ttl:
+                self.hits += 1
+                return record['weather'], True
+            if age < self.ttl + self.stale:
+                self.stale_hits += 1
+                return record['weather'], False
+            self.misses += 1
+            return None, False
+
+    def store(self, city, weather):
+        """保存一次成功获取的天气"""
+        with self.lock:
+            self.cities[city] = {
+                'fetched_at': time.time(),
+                'date': date.today().isoformat(),
+                'weather': weather,
+            }
+
+    def revalidate(self, city, loader):
+        """在后台调用 loader() 重新获取天气，同一城市同时只刷新一次；loader 返回 None 表示失败"""
+        with self.lock:
+            if city in self.pending:
+                return
+            thread = threading.Thread(target=self._refresh, args=(city, loader), daemon=True,
+                                      name=f'weather-{city}')
+            self.pending[city] = thread
+        thread.start()
+
+    def _refresh(self, city, loader):
+        try:
+            weather = loader()
+            if weather is not None:
+                self.store(city, weather)
+        except Exception as e:
+            print(f"后台刷新{city}天气失败: {str(e)}")
+        finally:
+            with self.lock:
+                self.pending.pop(city, None)
+
+    def wait(self, timeout=10):
+        """等待后台刷新结束（最多 timeout 秒）"""
+        deadline = time.monotonic() + timeout
+        with self.lock:
+            threads = list(self.pending.values())
+        for thread in threads:
+            thread.join(max(0, deadline - time.monotonic()))
+
+    def save(self):
+        """等后台刷新完成后写回磁盘（先写临时文件再替换）"""
+        self.wait()
+        with self.lock:
+            save_json(self.path, self.cities, ensure_ascii=False)
+
+    def report(self):
+        """本次运行的缓存统计"""
+        return f"天气缓存: 命中 {self.hits} 次, 过期后台刷新 {self.stale_hits} 次, 未命中 {self.misses} 次"